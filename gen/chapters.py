@@ -0,0 +1,74 @@
+#!/usr/bin/env python2.7
+
+# read the titles of the sections, which sections belong to which
+# chapters and which chapters belong to which stages from the rst files
+# used by gen/gen_dot2.py
+#
+# each rst file is read once; the files are read in a thread pool.
+# only the first line (the title) of the sections is needed, but the
+# whole file is read for the chapters (*_index.rst).
+
+import os
+import re
+import glob
+import multiprocessing.pool
+
+# the sections in a chapter index
+section_reg = re.compile(" *([a-z0-9_]+)$")
+
+class Book(object):
+    def __init__(self):
+        # file name without .rst: first line of the file
+        self.titles = dict()
+        # the sections that are not part of the dependency graph
+        # aren't included
+        self.sections = list()
+        # chapter: list of sections
+        self.chapters = dict()
+        # section: chapter
+        self.chapter_of = dict()
+        # stage number: (title, list of chapters)
+        self.stages = dict()
+
+def read_file(filename):
+    name = os.path.basename(filename)[:-4]
+    with open(filename, 'r') as f:
+        if name.endswith('_index'):
+            lines = f.readlines()
+        else:
+            lines = [f.readline()]
+    return name, lines
+
+def scan(rst_dir='rst', threads=8):
+    filenames = sorted(glob.glob(os.path.join(rst_dir, '*.rst')))
+    pool = multiprocessing.pool.ThreadPool(threads)
+    files = pool.map(read_file, filenames)
+    pool.close()
+    pool.join()
+
+    book = Book()
+    for name, lines in files:
+        book.titles[name] = lines[0].strip() if lines else ''
+        if 'index' not in name:
+            if not name.startswith('ex_') and name != 'dep':
+                book.sections.append(name)
+            continue
+        if not name.endswith('_index') or name.startswith('ex_'):
+            continue
+        if name.startswith('ch'):
+            # the stages list the chapters
+            chapters = [line.strip() for line in lines[1:] if line.strip().endswith('_index')]
+            book.stages[int(name[2])] = (book.titles[name], chapters)
+            continue
+        sections = list()
+        for line in lines:
+            res = section_reg.match(line)
+            if res:
+                sections.append(res.group(1))
+                book.chapter_of[res.group(1)] = name
+        book.chapters[name] = sections
+    return book
+
+def labels(book):
+    for name in book.sections:
+        yield '    %s [label="%s"];' % (name, book.titles[name])
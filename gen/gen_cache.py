@@ -0,0 +1,105 @@
+#!/usr/bin/env python2.7
+
+# run the steps generating the dependency graphs only when needed
+# usage: gen/gen_cache.py [step...]; runs all steps by default
+
+# the inputs and outputs of each step are hashed and stored in
+# gen/.cache_<step>.json after the step has run. the step is run again
+# only if the contents of an input or an output have changed since,
+# or an output is missing. files whose modification time and size
+# are the same as when they were last hashed aren't read again.
+#
+# because the contents are compared, a step whose inputs were
+# regenerated but came out the same isn't run again.
+
+import os
+import sys
+import glob
+import json
+import hashlib
+import subprocess
+import collections
+
+# step name: (input files or patterns, output files, command)
+steps = collections.OrderedDict([
+    ('dep',    (['rst/*.rst', 'gen/dep_header.dot', 'gen/dep_footer.dot',
+                 'gen/chapters.py', 'gen/gen_dot2.py', 'material/dot/dot2.py', 'gen/gen_dot.sh'],
+                ['gen/dep_labels.dot', 'gen/dep.dot', 'gen/dep2.dot'],
+                'gen/gen_dot.sh')),
+    ('graphs', (['gen/dep.dot', 'gen/dep2.dot', 'gen/gen_graphs.py', 'material/dot/dot2.py'],
+                ['gen/dependencies.png', 'gen/dependencies2.png'],
+                'gen/gen_graphs.py')),
+])
+
+def content_hash(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), ''):
+            h.update(block)
+    return h.hexdigest()
+
+# return {path: [mtime, size, hash]} for the files matching patterns,
+# reusing the hashes in known for unchanged files
+def hash_files(patterns, known):
+    ret = dict()
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            st = os.stat(path)
+            entry = known.get(path)
+            if not entry or entry[0] != st.st_mtime or entry[1] != st.st_size:
+                entry = [st.st_mtime, st.st_size, content_hash(path)]
+            ret[path] = entry
+    return ret
+
+def hashes(files):
+    return dict((path, entry[2]) for path, entry in files.items())
+
+def load_cache(filename):
+    try:
+        with open(filename, 'r') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {'command': None, 'inputs': {}, 'outputs': {}}
+
+def save_cache(filename, cache):
+    with open(filename + '.tmp', 'w') as f:
+        json.dump(cache, f, indent=4, sort_keys=True)
+    os.rename(filename + '.tmp', filename)
+
+def run_step(name):
+    inputs, outputs, command = steps[name]
+    cache_file = 'gen/.cache_%s.json' % name
+    cache = load_cache(cache_file)
+    known = dict(cache['inputs'])
+    known.update(cache['outputs'])
+
+    in_files = hash_files(inputs, known)
+    out_files = hash_files(outputs, known)
+    if (cache['command'] == command and
+            hashes(in_files) == hashes(cache['inputs']) and
+            hashes(out_files) == hashes(cache['outputs']) and
+            len(out_files) == len(outputs)):
+        print '%s: up to date' % name
+        if in_files != cache['inputs'] or out_files != cache['outputs']:
+            # only the modification times changed
+            save_cache(cache_file, {'command': command, 'inputs': in_files, 'outputs': out_files})
+        return
+
+    print '%s: %s' % (name, command)
+    sys.stdout.flush()
+    subprocess.check_call(command, shell=True)
+    save_cache(cache_file, {'command': command, 'inputs': in_files, 'outputs': hash_files(outputs, {})})
+
+def main():
+    # the paths are relative to the top directory
+    os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    names = sys.argv[1:] or steps.keys()
+    for name in names:
+        if name not in steps:
+            print >> sys.stderr, 'Unknown step "%s"; the steps are: %s' % (name, ', '.join(steps))
+            sys.exit(1)
+    for name in names:
+        run_step(name)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 #!/bin/bash
 
-gen/gen_dot_labels.sh > gen/dep_labels.dot
-cat gen/dep_header.dot gen/dep_labels.dot gen/dep_footer.dot > gen/dep.dot
+# generates gen/dep_labels.dot, gen/dep.dot and gen/dep2.dot from one
+# reading of the rst files
 
-gen/gen_dot2.py > gen/dep2.dot
+gen/gen_dot2.py
@@ -1,16 +1,33 @@
 #!/usr/bin/env python2.7
 
-# generate a higher level chapter depedency graph
+# generate the section and chapter dependency graphs
+# usage: gen/gen_dot2.py; writes gen/dep_labels.dot, gen/dep.dot and gen/dep2.dot
 
-# first read in the lower level dependencies
-# then read in the chapter descriptions from the index rst files
+# first read in the titles, sections and chapters from the rst files
+# once (see chapters.py) and write the section labels and the section
+# graph, i.e. the labels between dep_header.dot and dep_footer.dot
+# then read in the lower level dependencies from the section graph
 # then find the dependencies between higher level chapters
 
 import re
+import os
 import collections
-import glob
 import sys
 
+import chapters
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'material', 'dot'))
+import dot2
+
+def write_sections(book):
+    with open('gen/dep_labels.dot', 'w') as f:
+        for line in chapters.labels(book):
+            f.write(line + '\n')
+    with open('gen/dep.dot', 'w') as f:
+        for filename in ['gen/dep_header.dot', 'gen/dep_labels.dot', 'gen/dep_footer.dot']:
+            with open(filename, 'r') as part:
+                f.write(part.read())
+
 def get_low_deps():
     reg = re.compile(" *(\S+) *-> *(\S+);")
     ret1 = collections.defaultdict(list)
@@ -23,82 +40,44 @@ def get_low_deps():
                 ret2[res.group(2)].append(res.group(1))
     return ret1, ret2
 
-def parse_stage(fn):
-    chapters = list()
-    have_header = False
-    with open(fn, 'r') as f:
-        for line in f:
-            if not have_header:
-                title = line.strip()
-                have_header = True
-            else:
-                if line.strip().endswith('_index'):
-                    chapters.append(line.strip())
-    return title, chapters
-
-def get_chap_desc():
-    files = glob.glob("rst/*_index.rst")
-    reg = re.compile(" *([a-z0-9_]+)$")
-    ret1 = collections.defaultdict(list)
-    ret2 = dict()
-    ret3 = dict()
-    stages = dict()
-    for fn in files:
-        if fn.startswith('rst/ex_'):
-            continue
-        if fn.startswith('rst/ch'):
-            stage = int(fn[6])
-            stages[stage] = parse_stage(fn)
-            continue
-        fn_clean = fn.replace('rst/', '').replace('.rst', '')
-        have_header = False
-        with open(fn, 'r') as f:
-            for line in f:
-                if not have_header:
-                    ret3[fn_clean] = line.strip()
-                    have_header = True
-                res = reg.match(line)
-                if res:
-                    ret1[fn_clean].append(res.group(1))
-                    ret2[res.group(1)] = fn_clean
-    return ret1, ret2, ret3, stages
-
-def get_deps(low_deps, rev_low_deps, chap_desc, rev_chap_desc):
+def get_deps(rev_low_deps, book):
     deps = collections.defaultdict(set)
-    for ch, ch_cont in chap_desc.items():
+    for ch, ch_cont in book.chapters.items():
         for subch in ch_cont:
             low_deps = rev_low_deps[subch]
             for ld in low_deps:
                 try:
-                    hd = rev_chap_desc[ld]
+                    hd = book.chapter_of[ld]
                 except KeyError:
                     print >> sys.stderr, 'Warning: chapter "%s" referenced in dependencies but not written' % ld
                 else:
                     deps[ch].add(hd)
     return deps
 
-def serialise(deps, headers, stages):
-    print 'digraph dep2 {'
-    print '    compound=true;'
-    for stagenum, (title, chapters) in sorted(stages.items()):
-        print '    subgraph cluster%d {' % (stagenum - 1)
+def serialise(deps, book, f=sys.stdout):
+    writer = dot2.DotWriter(f, 'dep2')
+    writer.write_line('    compound=true;')
+    for stagenum, (title, chapters) in sorted(book.stages.items()):
+        writer.write_line('    subgraph cluster%d {' % (stagenum - 1))
         for chap in sorted(chapters):
-            print '        %s [label="%s"];' % (chap, headers[chap])
-        print '    labelloc="t"';
-        print '    label="%s"' % title;
-        print '    }'
-    print
+            writer.write_line('        %s [label="%s"];' % (chap, book.titles[chap]))
+        writer.write_line('    labelloc="t"')
+        writer.write_line('    label="%s"' % title)
+        writer.write_line('    }')
+    writer.write_line('')
     for chap, to in sorted(deps.items()):
         for i in to:
             if i != chap:
-                print '    %s -> %s;' % (i, chap)
-    print '}'
+                writer.write(dot2.Edge(i, chap))
+    writer.close()
 
 def main():
+    book = chapters.scan()
+    write_sections(book)
     low_deps, rev_low_deps = get_low_deps()
-    chap_desc, rev_chap_desc, headers, stages = get_chap_desc()
-    deps = get_deps(low_deps, rev_low_deps, chap_desc, rev_chap_desc)
-    serialise(deps, headers, stages)
+    deps = get_deps(rev_low_deps, book)
+    with open('gen/dep2.dot', 'w') as f:
+        serialise(deps, book, f)
 
 if __name__ == "__main__":
     main()
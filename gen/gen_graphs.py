@@ -0,0 +1,87 @@
+#!/usr/bin/env python2.7
+
+# remove the redundant edges from the dependency graphs and render them
+# usage: gen/gen_graphs.py
+#
+# this does what "tred < gen/dep.dot | dot -Tpng > gen/dependencies.png"
+# did, but the redundant edges are removed using dot2.py. the graphs are
+# rendered in parallel, each to a temporary file that is renamed when
+# done, and the script returns when both are done so that the images
+# are never seen half written.
+
+import os
+import re
+import errno
+import sys
+import time
+import subprocess
+import multiprocessing
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'material', 'dot'))
+import dot2
+
+graphs = [('gen/dep.dot', 'gen/dependencies.png'),
+          ('gen/dep2.dot', 'gen/dependencies2.png')]
+
+edge_reg = re.compile(" *(\S+) *-> *(\S+);")
+
+# dep2.dot has subgraphs which the dot2 parser doesn't support, so the
+# edges are picked from the lines and all other lines are kept as they
+# are
+def reduce_graph(lines):
+    edges = list()
+    for line in lines:
+        res = edge_reg.match(line)
+        if res:
+            edges.append((res.group(1), res.group(2)))
+    redundant = dot2.transitive_reduction(edges)
+    for line in lines:
+        res = edge_reg.match(line)
+        if not res or (res.group(1), res.group(2)) not in redundant:
+            yield line
+
+def render(job):
+    dot_file, png_file = job
+    start = time.time()
+    with open(dot_file, 'r') as f:
+        text = ''.join(reduce_graph(f.readlines()))
+    reduced = time.time()
+    tmp_file = png_file + '.tmp'
+    try:
+        with open(tmp_file, 'wb') as f:
+            try:
+                p = subprocess.Popen(['dot', '-Tpng'], stdin=subprocess.PIPE, stdout=f)
+            except OSError as e:
+                if e.errno == errno.ENOENT:
+                    raise RuntimeError('graphviz dot not found, needed to render %s' % dot_file)
+                raise
+            p.communicate(text)
+        if p.returncode != 0:
+            raise RuntimeError('dot failed on %s' % dot_file)
+        os.rename(tmp_file, png_file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    return dot_file, reduced - start, time.time() - reduced
+
+def have_dot():
+    for path in os.environ.get('PATH', '').split(os.pathsep):
+        if os.access(os.path.join(path, 'dot'), os.X_OK):
+            return True
+    return False
+
+def main():
+    os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    # the images are nice to have, so the build goes on without them
+    if not have_dot():
+        print >> sys.stderr, 'Warning: graphviz dot not found, not rendering the dependency graphs'
+        return
+    pool = multiprocessing.Pool(len(graphs))
+    results = pool.map(render, graphs)
+    pool.close()
+    pool.join()
+    for dot_file, reduce_time, render_time in results:
+        print '%s: reduced in %.3f s, rendered in %.3f s' % (dot_file, reduce_time, render_time)
+
+if __name__ == "__main__":
+    main()
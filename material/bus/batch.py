@@ -0,0 +1,143 @@
+#!/usr/bin/env python2
+
+# write the label info for many bus stops at once
+# usage: batch.py 10:34 stops.txt sched.txt gps.txt|gps.bin gps_raw.txt
+#
+# stops.txt has one stop per line:
+# <x> <y> <label info file> <stop name>
+#
+# the schedule and the historical gps data describe the stop at (0, 0)
+# where the routes end. for any other stop, the time it takes a bus to
+# get from that stop to (0, 0) is taken from the historical data, and
+# the estimates and the schedule are moved earlier by that much. routes
+# that have no historical data near a stop don't serve that stop.
+#
+# the gps estimates and the schedule are calculated once for all stops;
+# for each stop they are only shifted, filtered and the first buses picked.
+
+import sys
+import heapq
+
+import util
+import gps_index
+import gps_bin
+import parse_gps_ex
+import sched_index
+import merge_ex
+import busd
+
+# number of scheduled departures looked at for each stop, as in sched_ex
+num_sched_entries = 50
+
+class Stop(object):
+    def __init__(self, name, x, y, label_filename):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.label_filename = label_filename
+        # routenr => minutes from this stop to (0, 0)
+        self.offsets = dict()
+
+def read_stops(filename):
+    stops = list()
+    with open(filename, 'r') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line:
+                continue
+            x, y, label_filename, name = line.split(' ', 3)
+            stops.append(Stop(name, float(x), float(y), label_filename))
+    return stops
+
+def route_offsets(lookup, routenrs, x, y):
+    if util.dist((x, y), (0.0, 0.0)) < 100.0:
+        return dict((routenr, 0.0) for routenr in routenrs)
+    offsets = dict()
+    for routenr in routenrs:
+        times = lookup.times_near(routenr, x, y, 100.0)
+        if times:
+            offsets[routenr] = sum(times) / float(len(times))
+    return offsets
+
+class StopSet(object):
+    def __init__(self, stops, sched_filename, hist_filename):
+        self.stops = stops
+        self.schedule = sched_index.ScheduleIndex.load(sched_filename)
+        self.hist = gps_index.GridIndex(gps_bin.load_historical(hist_filename))
+        routenrs = set(e[2] for e in self.schedule.entries)
+        for stop in self.stops:
+            stop.offsets = route_offsets(self.hist, routenrs, stop.x, stop.y)
+
+    # return the list of (stop, label lines)
+    def labels(self, now, gps_lines):
+        now_hr, now_minute = [int(n) for n in now.split(':')]
+
+        # shared by all stops
+        running_buses, passed_buses = parse_gps_ex.estimate_buses(gps_lines, self.hist)
+
+        ret = list()
+        for stop in self.stops:
+            gps_rows = self.gps_rows(stop, now_hr, now_minute, running_buses, passed_buses)
+            # only as many departures are generated as the stop needs
+            departures = self.schedule.iter_after((now_hr, now_minute))
+            sched_rows = self.sched_rows(stop, departures)
+            data = merge_ex.merge_rows((now_hr, now_minute), gps_rows + sched_rows, merge_ex.num_entries)
+            ret.append((stop, merge_ex.format_label(stop.name, now, data)))
+        return ret
+
+    def gps_rows(self, stop, now_hr, now_minute, running_buses, passed_buses):
+        running = list()
+        passed = [(r, s) for (r, s) in passed_buses if r in stop.offsets]
+        for routenr, startnr, t in running_buses:
+            if routenr not in stop.offsets:
+                continue
+            t -= stop.offsets[routenr]
+            if t > 0.0:
+                running.append((routenr, startnr, t))
+            else:
+                passed.append((routenr, startnr))
+        # running_buses is sorted by the time to (0, 0), this needs to
+        # be sorted by the time to the stop
+        running.sort(key=lambda (r, s, t): t)
+        return parse_gps_ex.to_rows(now_hr, now_minute, running, passed)
+
+    # departures is an iterator sorted by the time to (0, 0); pick the
+    # first num_sched_entries departures by the time to the stop
+    def sched_rows(self, stop, departures):
+        if not stop.offsets:
+            return list()
+        minute_offsets = dict((r, int(round(t))) for r, t in stop.offsets.items())
+        max_offset = max(minute_offsets.values())
+        heap = list()
+        for i, (route, startnr, dt, hr, mn) in enumerate(departures):
+            if len(heap) == num_sched_entries and dt - max_offset > -heap[0][0]:
+                # no later departure can arrive at the stop earlier
+                break
+            if route not in minute_offsets:
+                continue
+            stop_dt = dt - minute_offsets[route]
+            if stop_dt <= 0:
+                continue
+            item = (-stop_dt, -i, (route, startnr, hr * 60 + mn - minute_offsets[route]))
+            if len(heap) < num_sched_entries:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+        rows = list()
+        for _, _, (route, startnr, m) in sorted(heap, reverse=True):
+            m %= 1440
+            rows.append((route, startnr, m // 60, m % 60, 1))
+        return rows
+
+def main():
+    now = sys.argv[1]
+    stops = read_stops(sys.argv[2])
+    stop_set = StopSet(stops, sys.argv[3], sys.argv[4])
+    with open(sys.argv[5], 'r') as f:
+        gps_lines = f.readlines()
+    for stop, lines in stop_set.labels(now, gps_lines):
+        busd.write_label(stop.label_filename, lines)
+
+if __name__ == '__main__':
+    main()
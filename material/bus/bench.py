@@ -0,0 +1,164 @@
+#!/usr/bin/env python2
+
+# benchmark the bus stop pipeline
+# usage: bench.py [--sizes 5,25,100] [--runs 100] [--output results.json] [--compare old_results.json]
+#
+# for each size (number of routes), fixtures are generated with
+# gen_gps.py and gen_sched.py and each stage of the pipeline is run on
+# them. each stage runs in a forked copy of this process, so the
+# interpreter startup isn't included, and its wall time and peak
+# memory are recorded. peak memory is the maximum resident set size of
+# the forked process, so it includes the memory of this process at the
+# time of the fork (see baseline_max_rss_kb in the results).
+
+import os
+import sys
+import json
+import time
+import runpy
+import random
+import shutil
+import argparse
+import tempfile
+import resource
+import platform
+import subprocess
+import multiprocessing
+
+import util
+
+bus_dir = os.path.dirname(os.path.abspath(__file__))
+
+# (stage name, script, arguments, output file); the arguments are
+# formatted with the time and the file names of the fixture
+stages = [
+        ('gps',          'gps.py',          ['{time}', '{sched}', '{gps}'],                                'gps_raw.txt'),
+        ('parse_gps',    'parse_gps.py',    ['{time}', '{gps_raw}', '{gps}'],                              'gps_info.txt'),
+        ('parse_gps_ex', 'parse_gps_ex.py', ['{time}', '{gps_raw}', '{gps}'],                              'gps_info_ex.txt'),
+        ('sched',        'sched.py',        ['{time}', '{sched}'],                                         'sched_info.txt'),
+        ('sched_ex',     'sched_ex.py',     ['{time}', '{sched}'],                                         'sched_info_ex.txt'),
+        ('merge',        'merge.py',        ['My stop', '{time}', '{gps_info}', '{sched_info}'],           'label_info.txt'),
+        ('merge_ex',     'merge_ex.py',     ['My stop', '{time}', '{gps_info_ex}', '{sched_info_ex}'],     'label_info_ex.txt'),
+]
+
+def max_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+# run func in a forked process and return its wall time and peak memory
+def measure(func, *args):
+    def child(queue):
+        try:
+            start = time.time()
+            func(*args)
+            end = time.time()
+            queue.put((True, end - start, max_rss_kb(), None))
+        except BaseException as e:
+            queue.put((False, None, max_rss_kb(), '%s: %s' % (type(e).__name__, e)))
+
+    queue = multiprocessing.Queue()
+    p = multiprocessing.Process(target=child, args=(queue, ))
+    p.start()
+    result = queue.get()
+    p.join()
+    return result
+
+def generate_fixtures(workdir, num_routes, num_runs):
+    import gen_gps
+    import gen_sched
+    random.seed(21)
+    out = util.ShardedOutput(os.path.join(workdir, 'gps.txt'))
+    gen_gps.generate(out, num_routes, num_runs, 1)
+    out.close()
+    random.seed(21)
+    out = util.ShardedOutput(os.path.join(workdir, 'sched.txt'))
+    gen_sched.generate(out, num_routes, 1)
+    out.close()
+
+def run_script(script, argv, output):
+    sys.argv = [script] + argv
+    stdout = sys.stdout
+    with open(output, 'w') as f:
+        sys.stdout = f
+        try:
+            runpy.run_path(os.path.join(bus_dir, script), run_name='__main__')
+        finally:
+            sys.stdout = stdout
+
+def git_commit():
+    try:
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=bus_dir, stderr=devnull).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_size(workdir, num_routes, num_runs, now):
+    results = list()
+
+    def add(stage, (ok, seconds, rss, error)):
+        results.append({'routes': num_routes, 'runs': num_runs, 'stage': stage,
+            'ok': ok, 'seconds': seconds, 'max_rss_kb': rss, 'error': error})
+        if ok:
+            print '%6d routes  %-14s %9.3f s %10d kB' % (num_routes, stage, seconds, rss)
+        else:
+            print '%6d routes  %-14s failed: %s' % (num_routes, stage, error)
+
+    add('gen', measure(generate_fixtures, workdir, num_routes, num_runs))
+    files = {'time': now}
+    for name in ['gps', 'sched', 'gps_raw', 'gps_info', 'gps_info_ex', 'sched_info', 'sched_info_ex']:
+        files[name] = os.path.join(workdir, name + '.txt')
+    for stage, script, argv, output in stages:
+        # measure the schedule stages without the cached schedule index
+        if os.path.exists(files['sched'] + '.idx'):
+            os.remove(files['sched'] + '.idx')
+        argv = [a.format(**files) for a in argv]
+        add(stage, measure(run_script, script, argv, os.path.join(workdir, output)))
+    return results
+
+def compare(old, new):
+    old_results = dict(((r['routes'], r['stage']), r) for r in old['results'] if r['ok'])
+    print
+    print 'compared to %s:' % old.get('commit')
+    for r in new['results']:
+        o = old_results.get((r['routes'], r['stage']))
+        if not o or not r['ok']:
+            continue
+        print '%6d routes  %-14s time %6.2fx  memory %6.2fx' % (r['routes'], r['stage'],
+                r['seconds'] / max(o['seconds'], 1e-9),
+                r['max_rss_kb'] / float(max(o['max_rss_kb'], 1)))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='5,25,100',
+            help='comma separated numbers of routes')
+    parser.add_argument('--runs', type=int, default=100,
+            help='number of historical runs per route')
+    parser.add_argument('--time', default='10:00')
+    parser.add_argument('--output', help='write the results to this json file')
+    parser.add_argument('--compare', help='compare against the results in this json file')
+    parser.add_argument('--workdir', help='directory for the fixtures; by default a temporary directory')
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='bench_bus')
+    if not os.path.isdir(workdir):
+        os.makedirs(workdir)
+    report = {'commit': git_commit(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'baseline_max_rss_kb': max_rss_kb(),
+            'results': list()}
+    try:
+        for size in [int(n) for n in args.sizes.split(',')]:
+            report['results'].extend(run_size(workdir, size, args.runs, args.time))
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4, sort_keys=True)
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            compare(json.load(f), report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python2
+
+# benchmark the historical gps lookups in gps_index
+# usage: bench_gps.py [number of historical points] [number of running buses]
+
+import sys
+import time
+import random
+
+import util
+import gps_index
+
+random.seed(21)
+
+def gen_hist(num_points):
+    # random points along the lines from the route start positions to
+    # the bus stop at (0, 0), like gen_gps.py but without the runs
+    hist = list()
+    for i in xrange(num_points):
+        routenr, (sx, sy) = random.choice(util.routes)
+        f = random.random()
+        px = sx * f + random.uniform(-50.0, 50.0)
+        py = sy * f + random.uniform(-50.0, 50.0)
+        hist.append((routenr, f * 15.0, px, py))
+    return hist
+
+def gen_buses(hist, num_buses):
+    buses = list()
+    for i in xrange(num_buses):
+        routenr, t, px, py = random.choice(hist)
+        buses.append((routenr, px + random.uniform(-10.0, 10.0), py + random.uniform(-10.0, 10.0)))
+    return buses
+
+def run(name, make_lookup, hist, buses):
+    start = time.time()
+    lookup = make_lookup(hist)
+    built = time.time()
+    ret = list()
+    for times in gps_index.lookup_times(lookup, buses, 100.0):
+        ret.append(sum(times) / float(len(times)) if times else None)
+    end = time.time()
+    print '%-12s build %8.3f s   query %8.3f s   total %8.3f s' % (name, built - start, end - built, end - start)
+    return ret
+
+def main():
+    num_points = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    num_buses = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    hist = gen_hist(num_points)
+    buses = gen_buses(hist, num_buses)
+    print '%d historical points, %d running buses' % (num_points, num_buses)
+
+    linear = run('LinearScan', gps_index.LinearScan, hist, buses)
+    grid = run('GridIndex', gps_index.GridIndex, hist, buses)
+    assert linear == grid
+    if gps_index.numpy is not None:
+        vectorized = run('NumpyIndex', gps_index.NumpyIndex, hist, buses)
+        assert linear == vectorized
+    else:
+        print 'numpy not available, skipping NumpyIndex'
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python2
+
+# long running version of the run.sh pipeline
+# usage: busd.py "This is my stop" sched.txt gps.txt|gps.bin gps_raw.txt label_info.txt [seconds between updates]
+#
+# the schedule and the historical gps data are read and indexed once
+# at startup. after that, on every tick, the new lines in gps_raw.txt
+# are read in, the label info is recalculated in memory and written
+# to label_info.txt.
+
+import os
+import sys
+import time
+
+import gps_index
+import gps_bin
+import parse_gps_ex
+import sched_ex
+import sched_index
+import merge_ex
+
+# follows a file of current gps samples as written by gps.py
+class GpsFeed(object):
+    def __init__(self, filename):
+        self.filename = filename
+        self.inode = None
+        self.offset = 0
+        self.partial = ''
+        self.seq = 0
+        # (routenr, startnr) => (sequence number, latest line for that bus)
+        self.samples = dict()
+
+    def update(self):
+        try:
+            st = os.stat(self.filename)
+        except OSError:
+            return
+        if st.st_ino != self.inode or st.st_size < self.offset:
+            # file was replaced or truncated, i.e. gps.py wrote a new
+            # set of samples. otherwise the file is only appended to
+            # and just the new lines are read in. a rewrite in place
+            # that doesn't make the file shorter can't be told apart
+            # from appending, so a new set of samples should be written
+            # to a temporary file and renamed over the old one, as
+            # run_daemon.sh does.
+            self.inode = st.st_ino
+            self.offset = 0
+            self.partial = ''
+            self.samples = dict()
+        if st.st_size == self.offset:
+            return
+        with open(self.filename, 'r') as f:
+            f.seek(self.offset)
+            data = f.read()
+            self.offset = f.tell()
+        lines = (self.partial + data).split('\n')
+        # the last line is still being written unless it's empty
+        self.partial = lines.pop()
+        for line in lines:
+            l = line.split(' ')
+            if len(l) < 5:
+                continue
+            self.samples[(int(l[0]), int(l[1]))] = (self.seq, line)
+            self.seq += 1
+
+    # the lines in the order they were read in
+    def lines(self):
+        return [line for seq, line in sorted(self.samples.values())]
+
+class BusStop(object):
+    def __init__(self, stop_name, sched_filename, hist_filename):
+        self.stop_name = stop_name
+        self.schedule = sched_index.ScheduleIndex.load(sched_filename)
+        self.hist = gps_index.GridIndex(gps_bin.load_historical(hist_filename))
+
+    def label(self, now, feed):
+        now_hr, now_minute = [int(n) for n in now.split(':')]
+
+        running_buses, passed_buses = parse_gps_ex.estimate_buses(feed.lines(), self.hist)
+        gps_rows = parse_gps_ex.to_rows(now_hr, now_minute, running_buses, passed_buses)
+        sched_rows = [(r, s, th, tm, 1) for (r, s, dt, th, tm) in sched_ex.select_entries(now, self.schedule)]
+
+        data = merge_ex.merge_rows((now_hr, now_minute), gps_rows + sched_rows, merge_ex.num_entries)
+        return merge_ex.format_label(self.stop_name, now, data)
+
+# write to a temporary file first so that the display never sees a
+# half written file
+def write_label(filename, lines):
+    tmpname = filename + '.tmp'
+    with open(tmpname, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.rename(tmpname, filename)
+
+def main():
+    stop_name = sys.argv[1]
+    sched_filename = sys.argv[2]
+    hist_filename = sys.argv[3]
+    gps_filename = sys.argv[4]
+    label_filename = sys.argv[5]
+    interval = float(sys.argv[6]) if len(sys.argv) > 6 else 10.0
+
+    stop = BusStop(stop_name, sched_filename, hist_filename)
+    feed = GpsFeed(gps_filename)
+    while True:
+        feed.update()
+        now = time.strftime('%H:%M')
+        write_label(label_filename, stop.label(now, feed))
+        time.sleep(interval)
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,18 @@
 #!/usr/bin/env python2
 
+# generate historical gps data
+# usage: gen_gps.py [--routes N] [--runs N] [--output file [--shards N]]
+#
+# with the default arguments the output is the same as gps.txt. with
+# more routes, the routes in util.routes are followed by generated ones.
+# the output doesn't depend on the number of shards: the shards are
+# split by route and their concatenation is the same as the output
+# without sharding.
+
 import sys
 import math
 import random
-import json
+import argparse
 import util
 
 random.seed(21)
@@ -16,27 +25,45 @@ def progress(pos, speed):
     return (pos[0] + xcomp * length * -math.copysign(1.0, pos[0]),
             pos[1] + ycomp * length * -math.copysign(1.0, pos[1]))
 
-out = list()
-for route, start_pos in util.routes:
-    for n in xrange(100):
-        this = list()
-        curr_pos = (start_pos[0] + random.uniform(-5.0, 5.0),
-                    start_pos[1] + random.uniform(-5.0, 5.0))
-        curr_time = 0
-        positions = list()
-        speed = random.uniform(0.5, 1.0)
-        while util.dist(curr_pos, (0, 0)) > 100.0:
-            positions.append(curr_pos)
-            curr_pos = progress(curr_pos, speed)
-        final_positions = list()
-        time_skew = random.uniform(0.0, 10.0)
-        for i, p in enumerate(positions):
-            this.append({'route': route,
-                'time': ((len(positions) - i) * 10.0 + time_skew + random.uniform(0.0, 0.1)) / 60.0,
-                'pos': p})
-        out.append(this)
-
-#print json.dumps(out, indent=True)
-for el in out:
-    for i in el:
-        print i['route'], i['time'], i['pos'][0], i['pos'][1]
+# return the lines for one run of a bus from start_pos to the stop
+def gen_run(route, start_pos):
+    curr_pos = (start_pos[0] + random.uniform(-5.0, 5.0),
+                start_pos[1] + random.uniform(-5.0, 5.0))
+    positions = list()
+    speed = random.uniform(0.5, 1.0)
+    while util.dist(curr_pos, (0, 0)) > 100.0:
+        positions.append(curr_pos)
+        curr_pos = progress(curr_pos, speed)
+    time_skew = random.uniform(0.0, 10.0)
+    lines = list()
+    num_positions = len(positions)
+    for i, p in enumerate(positions):
+        t = ((num_positions - i) * 10.0 + time_skew + random.uniform(0.0, 0.1)) / 60.0
+        lines.append('%d %s %s %s' % (route, t, p[0], p[1]))
+    return lines
+
+def generate(out, num_routes, num_runs, num_shards):
+    routes = util.make_routes(num_routes)
+    for i, (route, start_pos) in enumerate(routes):
+        shard = i * num_shards // len(routes)
+        for n in xrange(num_runs):
+            out.write(shard, gen_run(route, start_pos))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--routes', type=int, default=len(util.routes))
+    parser.add_argument('--runs', type=int, default=100,
+            help='number of runs per route')
+    parser.add_argument('--output', help='output file instead of stdout')
+    parser.add_argument('--shards', type=int, default=1,
+            help='number of output files')
+    args = parser.parse_args()
+    if args.shards > 1 and not args.output:
+        parser.error('--shards requires --output')
+
+    out = util.ShardedOutput(args.output, args.shards)
+    generate(out, args.routes, args.runs, args.shards)
+    out.close()
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,47 @@
 #!/usr/bin/env python2
 
+# generate a bus schedule
+# usage: gen_sched.py [--routes N] [--output file [--shards N]]
+#
+# with the default arguments the output is the same as sched.txt. the
+# shards are split by route like in gen_gps.py.
+
 import sys
-import math
 import random
-import json
+import argparse
+import util
 
 random.seed(21)
 
-for route in [3, 29, 848, 6, 72]:
+def gen_route(route):
+    lines = list()
     start_nr = 0
     occurrence = random.choice([10, 12, 15, 20])
     start_min = random.randint(0, occurrence - 1)
     for hr in xrange(5, 24):
         for minute in xrange(start_min, 60, occurrence):
             start_nr += 1
-            print '%d %d %d %d' % (route, start_nr, hr, minute)
+            lines.append('%d %d %d %d' % (route, start_nr, hr, minute))
+    return lines
+
+def generate(out, num_routes, num_shards):
+    routes = util.make_routes(num_routes)
+    for i, (route, start_pos) in enumerate(routes):
+        out.write(i * num_shards // len(routes), gen_route(route))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--routes', type=int, default=len(util.routes))
+    parser.add_argument('--output', help='output file instead of stdout')
+    parser.add_argument('--shards', type=int, default=1,
+            help='number of output files')
+    args = parser.parse_args()
+    if args.shards > 1 and not args.output:
+        parser.error('--shards requires --output')
+
+    out = util.ShardedOutput(args.output, args.shards)
+    generate(out, args.routes, args.shards)
+    out.close()
 
+if __name__ == '__main__':
+    main()
@@ -4,51 +4,78 @@
 # input: time + gen_sched.py output + gen_gps.py output
 # output: some gps samples in the following format:
 # routenr startnr x y <flag already passed or not>
+# usage: gps.py [--jobs N] time sched.txt gps.txt
 
-import sys
 import random
+import argparse
+import collections
 
-import util
 import sched
+import gps_bin
+import gps_index
 
 random.seed(21)
 
-time = sys.argv[1]
-filename = sys.argv[2]
-datafilename = sys.argv[3]
-
-# buses soon to approach the stop according to schedule
-entries = sched.get_entries(time, filename, True)
-
-# parse gps training data
-data = list()
-with open(datafilename, 'r') as f:
-    for line in f:
-        l = line.split(' ')
-        routenr = int(l[0])
-        t = float(l[1])
-        px = float(l[2])
-        py = float(l[3])
-        data.append((routenr, t, px, py))
-
-# generate gps entry for each planned bus that hasn't
-# yet reached the stop
-for bus_routenr, startnr, dt, _ in entries:
-    options = list()
-    # new_dt is when the bus is expected to actually arrive
-    new_dt = dt + random.uniform(-2.0, 5.0)
-    for routenr, t, px, py in data:
+# return routenr => list of (t, x, y) from the gps training data
+def load_samples(filename):
+    ret = collections.defaultdict(list)
+    for routenr, t, px, py in gps_bin.load_historical(filename):
+        ret[routenr].append((t, px, py))
+    return dict(ret)
+
+# the bus is expected to arrive between 2 minutes early and 5 minutes
+# late, and a data point is picked if it's within a minute of the
+# expected arrival, so only data points in this window can be picked
+# for a bus that's planned to arrive in dt minutes
+def route_candidates(samples, routenr, dts):
+    route_samples = samples.get(routenr, ())
+    return [[s for s in route_samples if dt - 3.5 < s[0] < dt + 6.5] for dt in dts]
+
+# pool is an optional pool from gps_index.make_pool for samples
+def generate(entries, samples, pool=None):
+    candidates = gps_index.map_by_route(route_candidates, samples,
+            [(bus_routenr, dt) for bus_routenr, startnr, dt, _ in entries], pool=pool)
+
+    # the random numbers are drawn in the order of the entries so that
+    # the output doesn't depend on the number of processes
+    ret = list()
+    for (bus_routenr, startnr, dt, _), c in zip(entries, candidates):
+        # new_dt is when the bus is expected to actually arrive
+        new_dt = dt + random.uniform(-2.0, 5.0)
         # pick one of the data points from the historical data
         # pick one that's for this bus route and about the same
         # time as this one
-        if bus_routenr != routenr:
-            continue
-        timediff = abs(t - new_dt)
-        if timediff < 1.0:
-            options.append((px, py))
-    if options and random.random() < 0.9:
-        ox, oy = random.choice(options)
-        ox += random.uniform(-10.0, 10.0)
-        oy += random.uniform(-10.0, 10.0)
-        print bus_routenr, startnr, ox, oy, '2' if new_dt < 0.1 else '0', dt, new_dt
+        options = [(px, py) for t, px, py in c if abs(t - new_dt) < 1.0]
+        if options and random.random() < 0.9:
+            ox, oy = random.choice(options)
+            ox += random.uniform(-10.0, 10.0)
+            oy += random.uniform(-10.0, 10.0)
+            ret.append((bus_routenr, startnr, ox, oy, '2' if new_dt < 0.1 else '0', dt, new_dt))
+    return ret
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('time')
+    parser.add_argument('sched')
+    parser.add_argument('gps')
+    parser.add_argument('--jobs', type=int, default=1,
+            help='number of processes to share the routes between')
+    args = parser.parse_args()
+
+    # buses soon to approach the stop according to schedule
+    entries = sched.get_entries(args.time, args.sched, True)
+
+    # parse gps training data
+    samples = load_samples(args.gps)
+
+    pool = None
+    if args.jobs > 1:
+        pool = gps_index.make_pool(samples, args.jobs)
+
+    # generate gps entry for each planned bus that hasn't
+    # yet reached the stop
+    for sample in generate(entries, samples, pool):
+        print ' '.join(str(n) for n in sample)
 
+if __name__ == '__main__':
+    main()
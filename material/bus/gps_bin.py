@@ -0,0 +1,131 @@
+#!/usr/bin/env python2
+
+# binary format for the historical gps data
+# usage: gps_bin.py gps.txt gps.bin
+#
+# layout, all little endian:
+#   header:      "GPSB" <version:uint32> <number of routes:uint32>
+#   route table: for each route <routenr:int32> <first record:uint32> <number of records:uint32>
+#   records:     for each sample <routenr:int32> <t:float32> <x:float32> <y:float32>
+#
+# the records are sorted by route, keeping the original order within a
+# route, so all samples of a route are next to each other in the file.
+# note that the floats are stored with single precision.
+
+import sys
+import math
+import mmap
+import array
+import struct
+
+import gps_index
+import parse_gps_ex
+
+numpy = gps_index.numpy
+
+MAGIC = 'GPSB'
+VERSION = 1
+header = struct.Struct('<4sII')
+route_entry = struct.Struct('<iII')
+record = struct.Struct('<ifff')
+if numpy is not None:
+    record_dtype = numpy.dtype([('routenr', '<i4'), ('t', '<f4'), ('x', '<f4'), ('y', '<f4')])
+
+def convert(txt_filename, bin_filename):
+    hist = parse_gps_ex.parse_historical_data(txt_filename)
+    hist.sort(key=lambda (r, t, x, y): r)
+
+    routes = list()
+    for i, (routenr, t, x, y) in enumerate(hist):
+        if not routes or routes[-1][0] != routenr:
+            routes.append([routenr, i, 0])
+        routes[-1][2] += 1
+
+    with open(bin_filename, 'wb') as f:
+        f.write(header.pack(MAGIC, VERSION, len(routes)))
+        for routenr, first, count in routes:
+            f.write(route_entry.pack(routenr, first, count))
+        for sample in hist:
+            f.write(record.pack(*sample))
+
+def is_binary(filename):
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+class HistoricalData(object):
+    def __init__(self, filename):
+        with open(filename, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, num_routes = header.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise RuntimeError('%s: not a version %d gps file' % (filename, VERSION))
+        # routenr => (offset of first record, number of records)
+        self.routes = dict()
+        records_start = header.size + num_routes * route_entry.size
+        for i in xrange(num_routes):
+            routenr, first, count = route_entry.unpack_from(self.mm, header.size + i * route_entry.size)
+            self.routes[routenr] = (records_start + first * record.size, count)
+        # routenr => (t, x, y) arrays, made on first use
+        self.arrays = dict()
+
+    def __len__(self):
+        return sum(count for offset, count in self.routes.values())
+
+    def __iter__(self):
+        for routenr in sorted(self.routes):
+            for t, x, y in self.route_samples(routenr):
+                yield routenr, t, x, y
+
+    # return the t, x and y of the samples of the route as three arrays:
+    # float64 numpy arrays if numpy is available, otherwise float32
+    # array.arrays. they're made once per route and then reused.
+    def route_arrays(self, routenr):
+        arrays = self.arrays.get(routenr)
+        if arrays is None:
+            offset, count = self.routes.get(routenr, (0, 0))
+            if numpy is not None:
+                r = numpy.frombuffer(self.mm, dtype=record_dtype, count=count, offset=offset)
+                arrays = tuple(r[f].astype(numpy.float64) for f in ('t', 'x', 'y'))
+            else:
+                a = array.array('f', self.mm[offset:offset + count * record.size])
+                if sys.byteorder != 'little':
+                    a.byteswap()
+                # the route numbers in between are read as floats but skipped
+                arrays = (a[1::4], a[2::4], a[3::4])
+            self.arrays[routenr] = arrays
+        return arrays
+
+    # return the (t, x, y) samples of the route
+    def route_samples(self, routenr):
+        return zip(*[a.tolist() for a in self.route_arrays(routenr)])
+
+    def times_near(self, routenr, gx, gy, radius):
+        return self.batch_times_near(routenr, [(gx, gy)], radius)[0]
+
+    # same as gps_index.LinearScan but only looks at the samples of the
+    # route; return the list of times for each of the (x, y) points
+    def batch_times_near(self, routenr, points, radius):
+        t, px, py = self.route_arrays(routenr)
+        if numpy is not None:
+            return gps_index.array_times_near(t, px, py, points, radius)
+        samples = zip(t, px, py)
+        sqrt = math.sqrt
+        ret = list()
+        for gx, gy in points:
+            # same as util.dist, inlined
+            ret.append([st for st, sx, sy in samples
+                        if sqrt(((sx - gx) ** 2) + ((sy - gy) ** 2)) < radius])
+        return ret
+
+# load the historical gps data either from a binary file written by
+# convert() or from the text format generated by gen_gps.py
+def load_historical(filename):
+    if is_binary(filename):
+        return HistoricalData(filename)
+    return parse_gps_ex.parse_historical_data(filename)
+
+def main():
+    convert(sys.argv[1], sys.argv[2])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python2
+
+# lookups into the historical gps data
+#
+# all classes answer the same question: which historical samples of
+# a route lie within a radius of the given point, and how long did it
+# take from there to the bus stop. LinearScan looks at every sample;
+# GridIndex puts the samples of each route in a uniform grid and only
+# looks at the cells that can be within the radius; NumpyIndex
+# compares all samples of a route against all buses on that route in
+# one array operation.
+
+import math
+import collections
+import multiprocessing
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import util
+
+class LinearScan(object):
+    def __init__(self, hist):
+        self.hist = hist
+
+    def times_near(self, routenr, gx, gy, radius):
+        times = list()
+        for bus_routenr, t, px, py in self.hist:
+            if bus_routenr != routenr:
+                continue
+            d = util.dist((px, py), (gx, gy))
+            if d < radius:
+                times.append(t)
+        return times
+
+class GridIndex(object):
+    def __init__(self, hist, cell_size=100.0):
+        self.cell_size = cell_size
+        # routenr => (cell x, cell y) => list of (sample nr, t, x, y)
+        self.routes = collections.defaultdict(lambda: collections.defaultdict(list))
+        for i, (routenr, t, px, py) in enumerate(hist):
+            self.routes[routenr][self.cell(px, py)].append((i, t, px, py))
+        # no more inserts after this, so drop the default factories
+        self.routes = dict((routenr, dict(cells)) for routenr, cells in self.routes.items())
+
+    def cell(self, x, y):
+        return (int(math.floor(x / self.cell_size)),
+                int(math.floor(y / self.cell_size)))
+
+    def times_near(self, routenr, gx, gy, radius):
+        cells = self.routes.get(routenr)
+        if not cells:
+            return list()
+        reach = int(math.ceil(radius / self.cell_size))
+        cx, cy = self.cell(gx, gy)
+        found = list()
+        for x in xrange(cx - reach, cx + reach + 1):
+            for y in xrange(cy - reach, cy + reach + 1):
+                for i, t, px, py in cells.get((x, y), ()):
+                    d = util.dist((px, py), (gx, gy))
+                    if d < radius:
+                        found.append((i, t))
+        # return the times in the order of the historical data so that
+        # averaging them gives exactly the same result as LinearScan
+        found.sort()
+        return [t for i, t in found]
+
+class NumpyIndex(object):
+    # upper limit for the number of distances calculated at once
+    max_block = 1 << 22
+
+    def __init__(self, hist):
+        if numpy is None:
+            raise RuntimeError('NumpyIndex requires numpy')
+        samples = collections.defaultdict(list)
+        for routenr, t, px, py in hist:
+            samples[routenr].append((t, px, py))
+        # routenr => (t, x, y) arrays
+        self.routes = dict()
+        for routenr, s in samples.items():
+            a = numpy.array(s, dtype=numpy.float64).reshape(-1, 3)
+            self.routes[routenr] = (a[:, 0].copy(), a[:, 1].copy(), a[:, 2].copy())
+
+    def times_near(self, routenr, gx, gy, radius):
+        return self.batch_times_near(routenr, [(gx, gy)], radius)[0]
+
+    # return the list of times for each of the (x, y) points
+    def batch_times_near(self, routenr, points, radius):
+        if routenr not in self.routes:
+            return [list() for p in points]
+        t, px, py = self.routes[routenr]
+        return array_times_near(t, px, py, points, radius, self.max_block)
+
+# t, px and py are float64 arrays of the samples of one route; return
+# the list of times for each of the (x, y) points
+def array_times_near(t, px, py, points, radius, max_block=NumpyIndex.max_block):
+    ret = list()
+    step = max(1, max_block // max(1, len(t)))
+    for i in xrange(0, len(points), step):
+        g = numpy.array(points[i:i + step], dtype=numpy.float64).reshape(-1, 2)
+        # one row per bus, one column per historical sample
+        d = numpy.sqrt((px[numpy.newaxis, :] - g[:, 0:1]) ** 2 +
+                       (py[numpy.newaxis, :] - g[:, 1:2]) ** 2)
+        mask = d < radius
+        # the times are summed up in python afterwards so that the
+        # averages are exactly the same as with the other lookups
+        ret.extend(t[row].tolist() for row in mask)
+    return ret
+
+# the data used by the worker processes, e.g. one of the lookups above.
+# it's set before the workers are started so that they inherit it from
+# the parent process instead of it being pickled and sent to them with
+# every task.
+shared_data = None
+
+def make_pool(data, jobs):
+    global shared_data
+    shared_data = data
+    return multiprocessing.Pool(jobs)
+
+def shared_route_call((func, routenr, queries, args)):
+    return func(shared_data, routenr, queries, *args)
+
+# items is a list of (routenr, query). func(data, routenr, queries, *args)
+# is called once per route with the queries of that route and returns
+# a list of results, one per query. return the results in the order of
+# items. the routes are handled in the worker processes of pool if one
+# is given, in which case data must be what was given to make_pool.
+def map_by_route(func, data, items, args=(), pool=None):
+    by_route = collections.defaultdict(list)
+    for i, (routenr, query) in enumerate(items):
+        by_route[routenr].append(i)
+    routes = sorted(by_route.items())
+    tasks = [(func, routenr, [items[i][1] for i in indices], args) for routenr, indices in routes]
+
+    if pool is not None:
+        results = pool.map(shared_route_call, tasks)
+    else:
+        results = [func(data, routenr, queries, *args) for func, routenr, queries, args in tasks]
+
+    ret = [None] * len(items)
+    for (routenr, indices), route_results in zip(routes, results):
+        for i, result in zip(indices, route_results):
+            ret[i] = result
+    return ret
+
+def route_times(lookup, routenr, points, radius):
+    if hasattr(lookup, 'batch_times_near'):
+        return lookup.batch_times_near(routenr, points, radius)
+    return [lookup.times_near(routenr, gx, gy, radius) for gx, gy in points]
+
+# queries is a list of (routenr, x, y); return the list of times near
+# each of them
+def lookup_times(lookup, queries, radius, pool=None):
+    items = [(routenr, (gx, gy)) for routenr, gx, gy in queries]
+    return map_by_route(route_times, lookup, items, (radius, ), pool)
@@ -45,7 +45,7 @@ print sys.argv[2]
 
 for bi in data[:7]:
     print bi.routenr
-    print util.route_names[bi.routenr]
+    print util.route_names.get(bi.routenr, 'Route %d' % bi.routenr)
     if bi.kind == Kind.Schedule:
         print 'ca.',
     print '%02d:%02d' % (bi.hour, bi.minute)
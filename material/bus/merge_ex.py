@@ -3,6 +3,8 @@
 # usage: merge.py "This is my stop" 10:34 gps_info.txt sched_info.txt > label_info.txt
 
 import sys
+import heapq
+
 import sched_ex
 
 route_names = {
@@ -23,7 +25,12 @@ def int_to_kind(n):
             return n
     raise RuntimeError('No Kind')
 
+# number of buses shown on the display
+num_entries = 7
+
 class BusInfo(object):
+    __slots__ = ('routenr', 'startnr', 'hour', 'minute', 'kind')
+
     def __init__(self, routenr, startnr, hour, minute, kind):
         self.routenr = routenr
         self.startnr = startnr
@@ -31,34 +38,61 @@ class BusInfo(object):
         self.minute = minute
         self.kind = int_to_kind(kind)
 
-def parse_data(now, files):
-    ret = list()
+def read_rows(files):
     for fn in files:
         with open(fn, 'r') as f:
             for line in f:
-                routenr, startnr, hr, minute, kind = [int(n) for n in line.split()]
-                ret.append(BusInfo(routenr, startnr, hr, minute, kind))
+                yield [int(n) for n in line.split()]
+
+# return the first count buses to arrive, or all of them if count is None
+def parse_data(now, files, count=None):
+    return merge_rows(now, read_rows(files), count)
 
-    passed = set([(bi.routenr, bi.startnr) for bi in ret if bi.kind == Kind.Passed])
-    have_gps_data = set([(bi.routenr, bi.startnr) for bi in ret if bi.kind == Kind.GPS])
-    ret = [bi for bi in ret if (bi.routenr, bi.startnr) not in passed]
-    ret = [bi for bi in ret if (bi.routenr, bi.startnr) not in have_gps_data or bi.kind == Kind.GPS]
-    ret.sort(key=lambda bi: sched_ex.diff_time(now, (bi.hour, bi.minute)))
-    return ret
+# rows are (routenr, startnr, hour, minute, kind) as in the input files.
+# a bus is left out if any row says it has passed; otherwise its gps
+# estimate is used if there is one, and its scheduled time if not.
+def merge_rows(now, rows, count=None):
+    passed = set()
+    # (routenr, startnr) => (row number, BusInfo)
+    buses = dict()
+    for i, (routenr, startnr, hr, minute, kind) in enumerate(rows):
+        kind = int_to_kind(kind)
+        key = (routenr, startnr)
+        if kind == Kind.Passed:
+            passed.add(key)
+        elif key not in buses or (kind == Kind.GPS and buses[key][1].kind != Kind.GPS):
+            buses[key] = (i, BusInfo(routenr, startnr, hr, minute, kind))
+
+    # the row number keeps the order of buses arriving at the same time
+    # the same as in the input
+    arrivals = ((sched_ex.diff_time(now, (bi.hour, bi.minute)), i, bi)
+            for key, (i, bi) in buses.iteritems() if key not in passed)
+    if count is None:
+        arrivals = sorted(arrivals)
+    else:
+        arrivals = heapq.nsmallest(count, arrivals)
+    return [bi for dt, i, bi in arrivals]
+
+# return the lines of label_info.txt
+def format_label(stop_name, time, data):
+    lines = [stop_name, time]
+    for bi in data[:num_entries]:
+        lines.append(str(bi.routenr))
+        # generated routes (see util.make_routes) have no name
+        lines.append(route_names.get(bi.routenr, 'Route %d' % bi.routenr))
+        if bi.kind == Kind.Schedule:
+            lines.append('ca. %02d:%02d' % (bi.hour, bi.minute))
+        else:
+            lines.append('%02d:%02d' % (bi.hour, bi.minute))
+    return lines
 
 def main():
     now = [int(n) for n in sys.argv[2].split(':')]
     files = sys.argv[3:5]
-    data = parse_data(now, files)
+    data = parse_data(now, files, num_entries)
 
-    print sys.argv[1]
-    print sys.argv[2]
-    for bi in data[:7]:
-        print bi.routenr
-        print route_names[bi.routenr]
-        if bi.kind == Kind.Schedule:
-            print 'ca.',
-        print '%02d:%02d' % (bi.hour, bi.minute)
+    for line in format_label(sys.argv[1], sys.argv[2], data):
+        print line
 
 if __name__ == '__main__':
     main()
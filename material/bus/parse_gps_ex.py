@@ -9,11 +9,10 @@
 # for all that have passed:
 # <route nr> <start nr> 0 0 2
 
-import sys
-import math
+import argparse
 
-def dist(a, b):
-    return math.sqrt(((a[0] - b[0]) ** 2) + ((a[1] - b[1]) ** 2))
+import gps_index
+import gps_bin
 
 def parse_historical_data(filename):
     ret = list()
@@ -27,48 +26,47 @@ def parse_historical_data(filename):
             ret.append((routenr, t, px, py))
     return ret
 
-def get_running_buses(filename, hist):
-    buses = list()
-    passed_buses = list()
+# hist is either the list from parse_historical_data or one of the
+# lookup classes in gps_index
+# pool is an optional pool from gps_index.make_pool for hist
+def get_running_buses(filename, hist, pool=None):
     with open(filename, 'r') as f:
-        for line in f:
-            l = line.split(' ')[:5]
-            routenr = int(l[0])
-            startnr = int(l[1])
-            gx = float(l[2])
-            gy = float(l[3])
-            passed = l[4].strip() == '2'
-
-            if passed:
-                passed_buses.append((routenr, startnr))
-            else:
-                times = list()
-                for bus_routenr, t, px, py, in hist:
-                    if bus_routenr != routenr:
-                        continue
-                    d = dist((px, py), (gx, gy))
-                    if d < 100.0:
-                        times.append(t)
-                if times:
-                    avgtime = sum(times) / float(len(times))
-                    this_bus = (routenr, startnr, avgtime)
-                    buses.append(this_bus)
+        return estimate_buses(f, hist, pool)
 
-    buses.sort(key=lambda (r, s, t): t)
-    return buses, passed_buses
+# lines are in the format generated by gps.py
+def estimate_buses(lines, hist, pool=None):
+    if not hasattr(hist, 'times_near'):
+        hist = gps_index.LinearScan(hist)
+    running = list()
+    passed_buses = list()
+    for line in lines:
+        l = line.split(' ')[:5]
+        routenr = int(l[0])
+        startnr = int(l[1])
+        gx = float(l[2])
+        gy = float(l[3])
+        passed = l[4].strip() == '2'
 
-def main():
-    # parse arguments
-    time = sys.argv[1]
-    now_hr, now_minute = [int(n) for n in time.split(':')]
-    current_gps = sys.argv[2]
-    historical_gps = sys.argv[3]
+        if passed:
+            passed_buses.append((routenr, startnr))
+        else:
+            running.append((routenr, startnr, gx, gy))
 
-    # parse the data
-    historical_data = parse_historical_data(historical_gps)
-    running_buses, passed_buses = get_running_buses(current_gps, historical_data)
+    buses = list()
+    queries = [(routenr, gx, gy) for routenr, startnr, gx, gy in running]
+    all_times = gps_index.lookup_times(hist, queries, 100.0, pool)
+    for (routenr, startnr, gx, gy), times in zip(running, all_times):
+        if times:
+            avgtime = sum(times) / float(len(times))
+            this_bus = (routenr, startnr, avgtime)
+            buses.append(this_bus)
 
-    # output
+    buses.sort(key=lambda (r, s, t): t)
+    return buses, passed_buses
+
+# convert the estimates to rows in the sched.py output format
+def to_rows(now_hr, now_minute, running_buses, passed_buses):
+    rows = list()
     for routenr, startnr, time in running_buses[:20]:
         h = now_hr
         m = int(now_minute + time)
@@ -77,10 +75,45 @@ def main():
             h += 1
         if h > 23:
             h -= 24
-        print routenr, startnr, h, m, 0
+        rows.append((routenr, startnr, h, m, 0))
 
     for routenr, startnr in passed_buses:
-        print routenr, startnr, 0, 0, 2
+        rows.append((routenr, startnr, 0, 0, 2))
+    return rows
+
+lookups = {'linear': gps_index.LinearScan,
+           'grid':   gps_index.GridIndex,
+           'numpy':  gps_index.NumpyIndex}
+
+def main():
+    # parse arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument('time')
+    parser.add_argument('current_gps')
+    parser.add_argument('historical_gps')
+    # by default the binary data is looked up directly and the text
+    # data is put in a grid
+    parser.add_argument('lookup', nargs='?', choices=sorted(lookups))
+    parser.add_argument('--jobs', type=int, default=1,
+            help='number of processes to share the routes between')
+    args = parser.parse_args()
+    now_hr, now_minute = [int(n) for n in args.time.split(':')]
+    lookup_name = args.lookup
+
+    # parse the data
+    historical_data = gps_bin.load_historical(args.historical_gps)
+    if lookup_name is None and not hasattr(historical_data, 'times_near'):
+        lookup_name = 'grid'
+    if lookup_name is not None:
+        historical_data = lookups[lookup_name](historical_data)
+    pool = None
+    if args.jobs > 1:
+        pool = gps_index.make_pool(historical_data, args.jobs)
+    running_buses, passed_buses = get_running_buses(args.current_gps, historical_data, pool)
+
+    # output
+    for row in to_rows(now_hr, now_minute, running_buses, passed_buses):
+        print ' '.join(str(n) for n in row)
 
 if __name__ == '__main__':
     main()
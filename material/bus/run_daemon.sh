@@ -0,0 +1,29 @@
+#!/bin/bash
+
+set -e
+set -u
+
+# fake data - gps historical data and schedule
+gen_gps.py > gps.txt
+gen_sched.py > sched.txt
+
+# fake data - current gps data, written to a temporary file first so
+# that busd.py never sees a half written file
+now=$(date +"%H:%M")
+gps.py $now sched.txt gps.txt > gps_raw.txt.tmp
+mv gps_raw.txt.tmp gps_raw.txt
+
+# get gps and schedule info, merge them and write label_info.txt every 10 seconds
+busd.py "This is my stop" sched.txt gps.txt gps_raw.txt label_info.txt 10 &
+
+# display
+bus label_info.txt &
+
+while [ 1 ]; do
+    sleep 10
+
+    # fake data - current gps data
+    now=$(date +"%H:%M")
+    gps.py $now sched.txt gps.txt > gps_raw.txt.tmp
+    mv gps_raw.txt.tmp gps_raw.txt
+done
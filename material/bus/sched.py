@@ -2,27 +2,19 @@
 
 import sys
 import util
+import sched_index
 
 def get_entries(time, filename, get_nearby):
     now_hr, now_minute = time.split(':')
-    now = util.Time(int(now_hr), int(now_minute))
-
-    entries = list()
-    with open(filename, 'r') as f:
-        for line in f:
-            route, startnr, hr, mn = [int(n) for n in line.split(' ')]
-            time = util.Time(hr, mn)
-            dt = util.diff_time(now, time)
-            if (get_nearby and abs(dt) < 50) or (not get_nearby and dt > 0):
-                entries.append((route, startnr, dt, time))
+    now = (int(now_hr), int(now_minute))
 
+    schedule = sched_index.ScheduleIndex.load(filename)
+    num_entries = 50
     if get_nearby:
-        entries.sort(key=lambda (r, s, dt, t): abs(dt))
+        entries = schedule.nearby(now, num_entries)
     else:
-        entries.sort(key=lambda (r, s, dt, t): dt)
-
-    num_entries = 50
-    return entries[:num_entries]
+        entries = schedule.after(now, num_entries)
+    return [(r, s, dt, util.Time(hr, mn)) for (r, s, dt, hr, mn) in entries]
 
 def main():
     time = sys.argv[1]
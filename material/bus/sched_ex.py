@@ -2,6 +2,8 @@
 
 import sys
 
+import sched_index
+
 # return how many minutes t2 is ahead of t1
 def diff_time((t1h, t1m), (t2h, t2m)):
     hd = t2h - t1h
@@ -12,20 +14,21 @@ def diff_time((t1h, t1m), (t2h, t2m)):
         diff += 1440
     return diff
 
-def get_entries(time, filename):
-    now_hr, now_minute = [int(n) for n in time.split(':')]
-
-    entries = list()
+def load_schedule(filename):
+    schedule = list()
     with open(filename, 'r') as f:
         for line in f:
             route, startnr, hr, mn = [int(n) for n in line.split(' ')]
-            dt = diff_time((now_hr, now_minute), (hr, mn))
-            if dt > 0:
-                entries.append((route, startnr, dt, hr, mn))
+            schedule.append((route, startnr, hr, mn))
+    return schedule
 
-    entries.sort(key=lambda (r, s, dt, hr, mn): dt)
+def get_entries(time, filename):
+    return select_entries(time, sched_index.ScheduleIndex.load(filename))
 
-    return entries[:50]
+# schedule is a sched_index.ScheduleIndex
+def select_entries(time, schedule):
+    now_hr, now_minute = [int(n) for n in time.split(':')]
+    return schedule.after((now_hr, now_minute), 50)
 
 def main():
     time = sys.argv[1]
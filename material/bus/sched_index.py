@@ -0,0 +1,101 @@
+#!/usr/bin/env python2
+
+# index of a schedule file as generated by gen_sched.py
+# usage: sched_index.py sched.txt     (builds the sidecar file sched.txt.idx)
+#
+# the departures are sorted by the minute of the day, so that the
+# departures around a given time can be found with bisect instead of
+# looking at the whole schedule. the sorted schedule is saved next to
+# the schedule file and reused as long as the schedule doesn't change.
+
+import os
+import sys
+import heapq
+import bisect
+import marshal
+import itertools
+
+import sched_ex
+
+VERSION = 1
+
+class ScheduleIndex(object):
+    # schedule is a list of (route, startnr, hr, mn) as returned by
+    # sched_ex.load_schedule
+    def __init__(self, schedule=None):
+        if schedule is not None:
+            self.entries = sorted((hr * 60 + mn, i, route, startnr, hr, mn)
+                    for i, (route, startnr, hr, mn) in enumerate(schedule))
+            self.minutes = [e[0] for e in self.entries]
+
+    @classmethod
+    def load(cls, filename):
+        st = os.stat(filename)
+        stamp = (VERSION, st.st_size, st.st_mtime)
+        idx_filename = filename + '.idx'
+        try:
+            with open(idx_filename, 'rb') as f:
+                if marshal.load(f) == stamp:
+                    ret = cls()
+                    ret.entries = marshal.load(f)
+                    ret.minutes = [e[0] for e in ret.entries]
+                    return ret
+        except (IOError, EOFError, ValueError, TypeError):
+            pass
+
+        ret = cls(sched_ex.load_schedule(filename))
+        try:
+            with open(idx_filename + '.tmp', 'wb') as f:
+                marshal.dump(stamp, f)
+                marshal.dump(ret.entries, f)
+            os.rename(idx_filename + '.tmp', idx_filename)
+        except (IOError, OSError):
+            # can't write next to the schedule, use the index without saving it
+            pass
+        return ret
+
+    # return the (dt, file position, entry) for the departures with the
+    # minute of the day in [lo, hi) in the order of dt
+    def departures(self, lo, hi, now):
+        start = bisect.bisect_left(self.minutes, lo)
+        end = bisect.bisect_left(self.minutes, hi)
+        entries = self.entries
+        # islice would step through all the entries before start
+        for k in xrange(start, end):
+            m, i, route, startnr, hr, mn = entries[k]
+            yield sched_ex.diff_time(now, (hr, mn)), i, (route, startnr, hr, mn)
+
+    # generate the departures after now one at a time, in the same
+    # format and order as sched_ex.get_entries, so that the caller can
+    # stop as soon as it has seen enough
+    def iter_after(self, now):
+        now_m = now[0] * 60 + now[1]
+        # diff_time wraps the departures that are more than 12 hours
+        # in the past to the next day; the rest is as is
+        wrapped = self.departures(now_m - 1439, now_m - 720, now)
+        not_wrapped = self.departures(now_m + 1, sys.maxint, now)
+        for dt, i, (route, startnr, hr, mn) in heapq.merge(not_wrapped, wrapped):
+            yield route, startnr, dt, hr, mn
+
+    # return the next count departures after now
+    def after(self, now, count):
+        return list(itertools.islice(self.iter_after(now), count))
+
+    # return the count departures closest to now within 50 minutes, in
+    # the same format and order as sched.get_entries for nearby entries
+    def nearby(self, now, count):
+        now_m = now[0] * 60 + now[1]
+        candidates = itertools.chain(
+                self.departures(now_m - 1489, now_m - 1390, now),
+                self.departures(now_m - 49, now_m + 50, now))
+        nearest = heapq.nsmallest(count, ((abs(dt), i, dt, e) for dt, i, e in candidates))
+        ret = list()
+        for _, i, dt, (route, startnr, hr, mn) in nearest:
+            ret.append((route, startnr, dt, hr, mn))
+        return ret
+
+def main():
+    ScheduleIndex.load(sys.argv[1])
+
+if __name__ == '__main__':
+    main()
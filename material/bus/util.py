@@ -1,4 +1,6 @@
+import sys
 import math
+import random
 
 route_names = {
         3:   'Park Street',
@@ -13,6 +15,56 @@ routes = [(3, (-4000.0, -4000.0)),
         (6,   (-3500.0, -5000.0)),
         (72,  (-4800.0, 4200.0))]
 
+# return the first n routes: the ones above and then generated ones.
+# the generated routes don't use the global random number generator so
+# that they don't change the data generated with random.seed(21).
+def make_routes(n):
+    ret = routes[:n]
+    for i in xrange(len(ret), n):
+        routenr = 1000 + i
+        rand = random.Random(routenr)
+        length = rand.uniform(4000.0, 7000.0)
+        # the buses in gen_gps.py only find their way to the stop if
+        # they start near a diagonal, like the routes above
+        ratio = rand.uniform(0.7, 1.4)
+        x = rand.choice([-1.0, 1.0]) * length * ratio / math.sqrt(1.0 + ratio * ratio)
+        y = rand.choice([-1.0, 1.0]) * length / math.sqrt(1.0 + ratio * ratio)
+        ret.append((routenr, (x, y)))
+    return ret
+
+# writes lines to stdout, a file, or several files with the number of
+# the file appended to the file name. the lines are collected and
+# written out in chunks of about chunk_size bytes.
+class ShardedOutput(object):
+    def __init__(self, filename=None, num_shards=1, chunk_size=1 << 20):
+        self.chunk_size = chunk_size
+        if filename is None:
+            self.files = [sys.stdout]
+        elif num_shards == 1:
+            self.files = [open(filename, 'w')]
+        else:
+            self.files = [open('%s.%d' % (filename, i), 'w') for i in xrange(num_shards)]
+        self.buffers = [list() for f in self.files]
+        self.sizes = [0 for f in self.files]
+
+    def write(self, shard, lines):
+        self.buffers[shard].extend(lines)
+        self.sizes[shard] += sum(len(l) + 1 for l in lines)
+        if self.sizes[shard] >= self.chunk_size:
+            self.flush(shard)
+
+    def flush(self, shard):
+        if self.buffers[shard]:
+            self.files[shard].write('\n'.join(self.buffers[shard]) + '\n')
+        self.buffers[shard] = list()
+        self.sizes[shard] = 0
+
+    def close(self):
+        for i, f in enumerate(self.files):
+            self.flush(i)
+            if f is not sys.stdout:
+                f.close()
+
 def dist(a, b):
     return math.sqrt(((a[0] - b[0]) ** 2) + ((a[1] - b[1]) ** 2))
 
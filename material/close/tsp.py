@@ -1,71 +1,91 @@
 import math
+import argparse
 import itertools
 
 import random
 
-random.seed(21)
-N = 8
+from tsp_util import dist, route_dist
+import tsp_dp
+import tsp_bb
 
-input_data = list()
-for i in xrange(N):
-    x = random.randint(0, 100)
-    y = random.randint(0, 100)
-    input_data.append((x, y))
+def gen_points(N):
+    random.seed(21)
+    input_data = list()
+    for i in xrange(N):
+        x = random.randint(0, 100)
+        y = random.randint(0, 100)
+        input_data.append((x, y))
+    return input_data
 
 def fac(n):
     return math.factorial(n)
 
-for n in range(21):
-    f = fac(n)
-    print n, f, f * 4 / (1024 * 1024 * 1024.0)
+def brute_force(input_data):
+    all_permutations = list(itertools.permutations(input_data))
 
-def dist(a, b):
-    a0, a1 = a
-    b0, b1 = b
-    d0 = b0 - a0
-    d1 = b1 - a1
-    return math.sqrt(d0 * d0 + d1 * d1)
+    min_dist = 100000
+    min_route = None
+    for p in all_permutations:
+        dis = route_dist(p)
+        if dis < min_dist:
+            min_dist = dis
+            min_route = list(p)
+            min_route.append(p[0])
+    return min_dist, min_route
 
-def route_dist(route):
-    total = 0
-    for r1, r2 in zip(route, route[1:]):
-        total += dist(r1, r2)
-    total += dist(route[-1], route[0])
-    return total
+def nearest_neighbour(input_data):
+    min_route_heuristic = [input_data[0]]
+    open_nodes = set(input_data)
+    open_nodes.remove(input_data[0])
+    current_node = input_data[0]
+    while open_nodes:
+        min_dist = 100000
+        min_point = None
+        for p2 in input_data:
+            if p2 not in open_nodes:
+                continue
+            dis = dist(current_node, p2)
+            if dis < min_dist:
+                min_dist = dis
+                min_point = p2
+        if min_point is not None:
+            current_node = min_point
+            open_nodes.remove(current_node)
+            min_route_heuristic.append(current_node)
+    min_route_heuristic.append(input_data[0])
+    return min_route_heuristic
 
-all_permutations = list(itertools.permutations(input_data))
+# usage: tsp.py [number of points] [brute|dp|bb] [--jobs N]
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('N', type=int, nargs='?', default=8)
+    parser.add_argument('solver', nargs='?', default='brute', choices=['brute', 'dp', 'bb'])
+    parser.add_argument('--jobs', type=int, default=1,
+            help='number of processes for the bb solver')
+    args = parser.parse_args()
 
-min_dist = 100000
-min_route = None
-for p in all_permutations:
-    dis = route_dist(p)
-    if dis < min_dist:
-        min_dist = dis
-        min_route = list(p)
-        min_route.append(p[0])
+    # exact solvers; all return (min_dist, min_route)
+    solvers = {'brute': brute_force,
+               'dp':    tsp_dp.held_karp,
+               'bb':    tsp_bb.branch_and_bound}
+    if args.jobs > 1:
+        solvers['bb'] = lambda p: tsp_bb.parallel_branch_and_bound(p, args.jobs)
 
-print min_dist, min_route
+    N = args.N
+    solver = args.solver
+    input_data = gen_points(N)
 
-min_route_heuristic = [input_data[0]]
-open_nodes = set(input_data)
-open_nodes.remove(input_data[0])
-current_node = input_data[0]
-while open_nodes:
-    min_dist = 100000
-    min_point = None
-    for p2 in input_data:
-        if p2 not in open_nodes:
-            continue
-        dis = dist(current_node, p2)
-        if dis < min_dist:
-            min_dist = dis
-            min_point = p2
-    if min_point is not None:
-        current_node = min_point
-        open_nodes.remove(current_node)
-        min_route_heuristic.append(current_node)
-min_route_heuristic.append(input_data[0])
+    for n in range(21):
+        f = fac(n)
+        print n, f, f * 4 / (1024 * 1024 * 1024.0)
+
+    min_dist, min_route = solvers[solver](input_data)
+    print min_dist, min_route
+
+    min_route_heuristic = nearest_neighbour(input_data)
+    min_dist_heuristic = route_dist(min_route_heuristic)
+    print min_dist_heuristic, min_route_heuristic
+    assert(set(min_route) == set(min_route_heuristic))
 
-min_dist_heuristic = route_dist(min_route_heuristic)
-print min_dist_heuristic, min_route_heuristic
-assert(set(min_route) == set(min_route_heuristic))
+if __name__ == '__main__':
+    main()
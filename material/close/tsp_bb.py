@@ -0,0 +1,131 @@
+# exact travelling salesman tour using branch and bound
+#
+# the distances between all points are calculated once up front. the
+# routes are then built point by point, always starting from the first
+# point (as all rotations of a route have the same length), and a
+# partial route is abandoned as soon as it, together with the direct
+# way back to the first point, is no shorter than the best route found
+# so far. the nearest neighbour route is used as the first best route.
+#
+# parallel_branch_and_bound splits the search by the first few points
+# after the first one over worker processes. the workers share the
+# length of the best route found so far so that a short route found by
+# one worker lets the others prune more.
+
+import itertools
+import multiprocessing
+
+import tsp_util
+
+def distance_matrix(input_data):
+    return [[tsp_util.dist(a, b) for b in input_data] for a in input_data]
+
+# the best route found so far, as indices to the points
+class Best(object):
+    def __init__(self, dist, route):
+        self.dist = dist
+        self.route = route
+
+    def update(self, dist, route):
+        if dist < self.dist:
+            self.dist = dist
+            self.route = route
+
+def search(d, path, visited, length, best):
+    N = len(d)
+    last = path[-1]
+    if len(path) == N:
+        best.update(length + d[last][0], list(path))
+        return
+    for nxt in xrange(1, N):
+        if visited[nxt]:
+            continue
+        new_length = length + d[last][nxt]
+        # the rest of the route can't be shorter than going straight back
+        if new_length + d[nxt][0] >= best.dist:
+            continue
+        visited[nxt] = True
+        path.append(nxt)
+        search(d, path, visited, new_length, best)
+        path.pop()
+        visited[nxt] = False
+
+# the nearest neighbour route like in tsp.py
+def initial_best(d):
+    N = len(d)
+    route = [0]
+    length = 0
+    open_nodes = set(xrange(1, N))
+    while open_nodes:
+        nxt = min(open_nodes, key=lambda i: (d[route[-1]][i], i))
+        length += d[route[-1]][nxt]
+        route.append(nxt)
+        open_nodes.remove(nxt)
+    return Best(length + d[route[-1]][0], route)
+
+def branch_and_bound(input_data):
+    d = distance_matrix(input_data)
+    best = initial_best(d)
+    visited = [False] * len(input_data)
+    visited[0] = True
+    search(d, [0], visited, 0, best)
+    min_route = [input_data[i] for i in best.route] + [input_data[0]]
+    return tsp_util.route_dist(min_route[:-1]), min_route
+
+# set before the worker processes are started so that they inherit them
+shared_d = None
+shared_dist = None
+shared_lock = None
+
+# search all routes starting with the points in start; return the
+# best route found that's shorter than the best length known by any
+# worker when the task started
+def search_task(start):
+    d = shared_d
+    best = Best(shared_dist.value, None)
+    visited = [False] * len(d)
+    length = 0
+    for a, b in zip(start, start[1:]):
+        length += d[a][b]
+    for i in start:
+        visited[i] = True
+    if length + d[start[-1]][0] < best.dist:
+        search(d, list(start), visited, length, best)
+    if best.route is not None:
+        with shared_lock:
+            if best.dist < shared_dist.value:
+                shared_dist.value = best.dist
+    return best.dist, best.route
+
+def parallel_branch_and_bound(input_data, jobs):
+    global shared_d, shared_dist, shared_lock
+
+    N = len(input_data)
+    d = distance_matrix(input_data)
+    best = initial_best(d)
+    if N < 4:
+        search(d, [0], [True] + [False] * (N - 1), 0, best)
+    else:
+        shared_d = d
+        shared_dist = multiprocessing.RawValue('d', best.dist)
+        shared_lock = multiprocessing.Lock()
+
+        # the workers pick up the best length found by the others when
+        # they start a new task, so there should be many more tasks
+        # than workers
+        depth = 1
+        num_tasks = N - 1
+        while num_tasks < 16 * jobs and depth < N - 2:
+            depth += 1
+            num_tasks *= N - depth
+        tasks = [(0, ) + p for p in itertools.permutations(xrange(1, N), depth)]
+
+        pool = multiprocessing.Pool(jobs)
+        for dist, route in pool.imap_unordered(search_task, tasks):
+            if route is not None:
+                best.update(dist, route)
+        pool.close()
+        pool.join()
+
+    min_route = [input_data[i] for i in best.route] + [input_data[0]]
+    return tsp_util.route_dist(min_route[:-1]), min_route
@@ -0,0 +1,114 @@
+# exact travelling salesman tour using dynamic programming (Held-Karp)
+#
+# the tour starts and ends at the first point. best[S][j] is the length
+# of the shortest path that starts at the first point, visits all the
+# points in the set S and ends at point j, which is in S. S is a bit
+# mask over the other points, so there are 2^(N-1) sets, and
+#
+#   best[S][j] = min over i in S - {j} of best[S - {j}][i] + dist(i, j)
+#
+# which takes O(2^N * N^2) time instead of the O(N!) of trying all
+# permutations. the tables are kept in flat arrays (or numpy arrays
+# if numpy is available) rather than lists of lists.
+
+import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import tsp_util
+
+def held_karp(input_data):
+    N = len(input_data)
+    if N < 3:
+        min_route = list(input_data) + [input_data[0]]
+        return tsp_util.route_dist(min_route[:-1]), min_route
+
+    # the other points are numbered from 0 to m - 1
+    m = N - 1
+    start = [tsp_util.dist(input_data[0], p) for p in input_data[1:]]
+    d = [[tsp_util.dist(a, b) for b in input_data[1:]] for a in input_data[1:]]
+
+    if numpy is not None:
+        best, parent = numpy_tables(m, start, d)
+    else:
+        best, parent = python_tables(m, start, d)
+
+    # close the tour
+    full = (1 << m) - 1
+    last = min(range(m), key=lambda j: best[full * m + j] + start[j])
+
+    # follow the parents back to the first point
+    path = list()
+    S = full
+    j = last
+    while j >= 0:
+        path.append(input_data[j + 1])
+        i = int(parent[S * m + j])
+        S ^= 1 << j
+        j = i
+    min_route = [input_data[0]] + path[::-1] + [input_data[0]]
+    return tsp_util.route_dist(min_route[:-1]), min_route
+
+def python_tables(m, start, d):
+    size = (1 << m) * m
+    best = array.array('d', [float('inf')]) * size
+    # the point before j in the best path, or -1 if j is the first one
+    parent = array.array('b', [-1]) * size
+
+    for j in xrange(m):
+        best[(1 << j) * m + j] = start[j]
+
+    for S in xrange(1, 1 << m):
+        points = [j for j in xrange(m) if S & (1 << j)]
+        if len(points) == 1:
+            continue
+        for j in points:
+            prev = S ^ (1 << j)
+            base = prev * m
+            min_dist = float('inf')
+            min_i = -1
+            for i in points:
+                if i == j:
+                    continue
+                dis = best[base + i] + d[i][j]
+                if dis < min_dist:
+                    min_dist = dis
+                    min_i = i
+            best[S * m + j] = min_dist
+            parent[S * m + j] = min_i
+    return best, parent
+
+# same as python_tables, but all sets of the same size are handled at
+# once, in blocks to limit the memory used by the intermediate arrays
+def numpy_tables(m, start, d):
+    best = numpy.full((1 << m, m), numpy.inf)
+    parent = numpy.full((1 << m, m), -1, dtype=numpy.int8)
+    dm = numpy.array(d)
+
+    for j in xrange(m):
+        best[1 << j, j] = start[j]
+
+    masks = numpy.arange(1 << m)
+    sizes = numpy.zeros(1 << m, dtype=numpy.int8)
+    for j in xrange(m):
+        sizes += (masks >> j) & 1
+
+    block = max(1, (1 << 22) // (m * m))
+    for k in xrange(1, m):
+        layer = masks[sizes == k]
+        for b in xrange(0, len(layer), block):
+            S = layer[b:b + block]
+            # extending the path ending at i in S with j; the entries
+            # for i not in S are infinite
+            ext = best[S][:, :, numpy.newaxis] + dm[numpy.newaxis, :, :]
+            min_i = ext.argmin(axis=1)
+            min_dist = ext.min(axis=1)
+            for j in xrange(m):
+                sel = (S & (1 << j)) == 0
+                T = S[sel] | (1 << j)
+                best[T, j] = min_dist[sel, j]
+                parent[T, j] = min_i[sel, j]
+    return best.ravel(), parent.ravel()
@@ -0,0 +1,283 @@
+# heuristic travelling salesman tours for many points
+# usage: tsp_heur.py [number of points]
+#
+# the initial tour is the nearest neighbour tour as in tsp.py, but the
+# nearest point is looked up in a grid instead of going through all
+# the points. the tour is then improved with two kinds of moves:
+#
+# 2-opt:  remove two edges and reconnect the tour the other way, i.e.
+#         reverse the part of the tour between them
+# or-opt: move a segment of one to three points to between two other
+#         points, possibly reversing it
+#
+# only moves that connect a point to one of its nearest neighbours are
+# tried. every point has a "don't look" bit: it's set when no move
+# starting from the point improves the tour, and cleared again when
+# the tour around the point changes, so that the search concentrates
+# on the parts of the tour that are still changing.
+#
+# the tour is kept in an array with the position of each point in
+# another array, and the shorter side of the tour is reversed.
+
+import sys
+import math
+import time
+import heapq
+import random
+import collections
+
+import tsp_util
+import tsp_dp
+
+# number of nearest neighbours considered for each point
+num_neighbours = 8
+
+# the largest number of points for which the exact tour is calculated
+# to compare against
+max_exact = 12
+
+class Grid(object):
+    def __init__(self, points):
+        self.points = points
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        self.min_x = min(xs)
+        self.min_y = min(ys)
+        area = max(max(xs) - self.min_x, 1.0) * max(max(ys) - self.min_y, 1.0)
+        # about two points per cell
+        self.cell_size = math.sqrt(area * 2.0 / len(points))
+        self.cells = collections.defaultdict(list)
+        for i, p in enumerate(points):
+            self.cells[self.cell(p)].append(i)
+        self.max_ring = max(max(abs(cx), abs(cy)) for cx, cy in self.cells) + 1
+
+    def cell(self, p):
+        return (int((p[0] - self.min_x) / self.cell_size),
+                int((p[1] - self.min_y) / self.cell_size))
+
+    def ring(self, c, r):
+        cx, cy = c
+        if r == 0:
+            yield c
+            return
+        for x in xrange(cx - r, cx + r + 1):
+            yield (x, cy - r)
+            yield (x, cy + r)
+        for y in xrange(cy - r + 1, cy + r):
+            yield (cx - r, y)
+            yield (cx + r, y)
+
+    def remove(self, i):
+        c = self.cell(self.points[i])
+        self.cells[c].remove(i)
+        if not self.cells[c]:
+            del self.cells[c]
+
+    # return the indices of the k nearest points to p, except exclude
+    def nearest(self, p, k, exclude=None):
+        px, py = p
+        c = self.cell(p)
+        cx, cy = c
+        cs = self.cell_size
+        # distance from p to the edge of its cell
+        fx = (px - self.min_x) / cs - cx
+        fy = (py - self.min_y) / cs - cy
+        edge = min(fx, 1 - fx, fy, 1 - fy) * cs
+        points = self.points
+        hypot = math.hypot
+        found = list()
+        for r in xrange(self.max_ring + max(abs(cx), abs(cy)) + 1):
+            # when only few cells are left, going through all of them is
+            # faster than going through the empty cells around p. this
+            # finds the points of the inner rings again, so start over.
+            if 8 * r > len(self.cells):
+                found = list((hypot(points[i][0] - px, points[i][1] - py), i)
+                        for cell in self.cells.itervalues() for i in cell
+                        if i != exclude)
+                found = heapq.nsmallest(k, found)
+                break
+            for cell in self.ring(c, r):
+                for i in self.cells.get(cell, ()):
+                    if i != exclude:
+                        q = points[i]
+                        found.append((hypot(q[0] - px, q[1] - py), i))
+            # the points in the next rings are further than this
+            if len(found) >= k:
+                found = heapq.nsmallest(k, found)
+                if found[-1][0] <= r * cs + edge:
+                    break
+        return [i for dis, i in found]
+
+def nearest_neighbour(points, grid):
+    route = [0]
+    grid.remove(0)
+    for n in xrange(len(points) - 1):
+        nxt = grid.nearest(points[route[-1]], 1)[0]
+        grid.remove(nxt)
+        route.append(nxt)
+    return route
+
+class Tour(object):
+    def __init__(self, points, route, neighbours):
+        self.points = points
+        self.tour = list(route)
+        self.pos = [0] * len(route)
+        for i, p in enumerate(route):
+            self.pos[p] = i
+        self.neighbours = neighbours
+
+    def d(self, a, b):
+        pa = self.points[a]
+        pb = self.points[b]
+        return math.hypot(pa[0] - pb[0], pa[1] - pb[1])
+
+    def next(self, a):
+        i = self.pos[a] + 1
+        return self.tour[i if i < len(self.tour) else 0]
+
+    def prev(self, a):
+        return self.tour[self.pos[a] - 1]
+
+    # reverse the path going forward from a to b
+    def reverse(self, a, b):
+        N = len(self.tour)
+        i = self.pos[a]
+        j = self.pos[b]
+        inner = (j - i) % N + 1
+        if inner * 2 > N:
+            # reversing the rest of the tour gives the same tour
+            i, j = (j + 1) % N, (i - 1) % N
+            inner = N - inner
+        tour = self.tour
+        pos = self.pos
+        if i <= j:
+            seg = tour[j:i - 1 if i else None:-1]
+            tour[i:j + 1] = seg
+            for k, x in enumerate(seg, i):
+                pos[x] = k
+            return
+        for k in xrange(inner // 2):
+            x = tour[i]
+            y = tour[j]
+            tour[i] = y
+            pos[y] = i
+            tour[j] = x
+            pos[x] = j
+            i += 1
+            if i == N:
+                i = 0
+            j -= 1
+            if j < 0:
+                j = N - 1
+
+    # replace the edges x1-x2 and y1-y2 with x1-y1 and x2-y2. x2 must
+    # follow x1 and y2 must follow y1 in the same direction.
+    def move(self, x1, x2, y1, y2):
+        if self.next(x1) == x2:
+            self.reverse(x2, y1)
+        else:
+            self.reverse(y1, x2)
+
+    def two_opt(self, a):
+        for succ in (True, False):
+            b = self.next(a) if succ else self.prev(a)
+            dab = self.d(a, b)
+            for c in self.neighbours[a]:
+                dac = self.d(a, c)
+                if dac >= dab:
+                    break
+                d = self.next(c) if succ else self.prev(c)
+                if c == b or d == a:
+                    continue
+                delta = dac + self.d(b, d) - dab - self.d(c, d)
+                if delta < -1e-10:
+                    if succ:
+                        self.move(a, b, c, d)
+                    else:
+                        self.move(b, a, d, c)
+                    return (a, b, c, d)
+        return None
+
+    def or_opt(self, a):
+        N = len(self.tour)
+        for seg_len in (1, 2, 3):
+            if N < seg_len + 3:
+                break
+            s1 = a
+            segment = [s1]
+            for k in xrange(seg_len - 1):
+                segment.append(self.next(segment[-1]))
+            s2 = segment[-1]
+            p = self.prev(s1)
+            n = self.next(s2)
+            removed = self.d(p, s1) + self.d(s2, n) - self.d(p, n)
+            for c in self.neighbours[s1]:
+                if self.d(s1, c) >= removed:
+                    break
+                if c in segment:
+                    continue
+                for u, w in ((c, self.next(c)), (self.prev(c), c)):
+                    if u in segment or w in segment or w == p:
+                        continue
+                    forward = self.d(u, s1) + self.d(s2, w)
+                    backward = self.d(u, s2) + self.d(s1, w)
+                    delta = min(forward, backward) - self.d(u, w) - removed
+                    if delta < -1e-10:
+                        # insert the segment reversed between u and w,
+                        # then turn it around if that's shorter
+                        self.move(p, s1, u, w)
+                        self.move(p, u, n, s2)
+                        if forward < backward:
+                            self.move(u, s2, s1, w)
+                        return (p, n, u, w, s1, s2)
+        return None
+
+    def improve(self):
+        N = len(self.tour)
+        queue = collections.deque(self.tour)
+        active = [True] * N
+        while queue:
+            a = queue.popleft()
+            active[a] = False
+            changed = self.two_opt(a) or self.or_opt(a)
+            if changed:
+                for x in changed:
+                    if not active[x]:
+                        active[x] = True
+                        queue.append(x)
+
+    def route(self):
+        i = self.pos[0]
+        return self.tour[i:] + self.tour[:i]
+
+# return (dist, route) where route is as in tsp.py
+def solve(points):
+    if len(points) < 4:
+        route = list(points) + [points[0]]
+        return tsp_util.route_dist(route[:-1]), route
+    grid = Grid(points)
+    neighbours = [grid.nearest(p, num_neighbours, i) for i, p in enumerate(points)]
+    tour = Tour(points, nearest_neighbour(points, grid), neighbours)
+    tour.improve()
+    route = [points[i] for i in tour.route()] + [points[0]]
+    return tsp_util.route_dist(route[:-1]), route
+
+def gen_points(N):
+    random.seed(21)
+    return [(random.uniform(0, 1000), random.uniform(0, 1000)) for i in xrange(N)]
+
+def main():
+    N = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    points = gen_points(N)
+
+    start = time.time()
+    improved, route = solve(points)
+    end = time.time()
+
+    print 'heuristic: %.2f (%.2f s)' % (improved, end - start)
+    if N <= max_exact:
+        exact, exact_route = tsp_dp.held_karp(points)
+        print 'exact:     %.2f, gap %.2f%%' % (exact, (improved - exact) / exact * 100.0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+# the distances shared by the tsp solvers
+
+import math
+
+def dist(a, b):
+    a0, a1 = a
+    b0, b1 = b
+    d0 = b0 - a0
+    d1 = b1 - a1
+    return math.sqrt(d0 * d0 + d1 * d1)
+
+def route_dist(route):
+    total = 0
+    for r1, r2 in zip(route, route[1:]):
+        total += dist(r1, r2)
+    total += dist(route[-1], route[0])
+    return total
@@ -0,0 +1,46 @@
+#!/usr/bin/env python2
+
+# benchmark the transitive reduction in dot2 on a random DAG
+# usage: bench_tred.py [number of nodes] [number of edges]
+
+import sys
+import time
+import random
+
+import dot2
+
+random.seed(21)
+
+def gen_dag(num_nodes, num_edges):
+    # edges only go from earlier to later nodes in a random order,
+    # so there are no cycles
+    nodes = ['n%d' % i for i in xrange(num_nodes)]
+    random.shuffle(nodes)
+    edges = set()
+    while len(edges) < num_edges:
+        a, b = sorted(random.sample(xrange(num_nodes), 2))
+        edges.add((nodes[a], nodes[b]))
+    return list(edges)
+
+def main():
+    num_nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    num_edges = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    edges = gen_dag(num_nodes, num_edges)
+
+    start = time.time()
+    redundant = dot2.transitive_reduction(edges)
+    end = time.time()
+    print 'transitive reduction: %d nodes, %d edges, %d redundant: %.2f s' % (num_nodes,
+            num_edges, len(redundant), end - start)
+
+    text = 'digraph bench {\n%s}\n' % ''.join('    %s -> %s;\n' % e for e in edges)
+    start = time.time()
+    p = dot2.Parser(dot2.lex(text))
+    p.parse()
+    parsed = time.time()
+    p.graph.simplify()
+    end = time.time()
+    print 'parse %d bytes: %.2f s, simplify: %.2f s' % (len(text), parsed - start, end - parsed)
+
+if __name__ == '__main__':
+    main()
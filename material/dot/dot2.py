@@ -1,8 +1,9 @@
 #!/usr/bin/env python2
 
 import re
+import sys
+import StringIO
 import collections
-import copy
 
 # graph        ::= "digraph" characters '{' statements '}'
 # statements   ::= '' | statement statements
@@ -27,37 +28,44 @@ class Token(object):
     SEMICOLON = 9
     ARROW = 10
 
-tokens = [(re.compile('='), Token.EQUALS),
-          (re.compile('[ \n\t]+'), None),
-          (re.compile('digraph'), Token.DIGRAPH),
-          (re.compile('\".*\"'), Token.QUOTE),
-          (re.compile('{'), Token.OPEN_CURLY),
-          (re.compile('}'), Token.CLOSE_CURLY),
-          (re.compile('\['), Token.OPEN_SQUARE),
-          (re.compile(']'), Token.CLOSE_SQUARE),
-          (re.compile('label'), Token.LABEL),
-          (re.compile(';'), Token.SEMICOLON),
-          (re.compile('[a-zA-Z0-9_]+'), Token.IDENTIFIER),
-          (re.compile('->'), Token.ARROW)]
-
-lexer_output = list()
-
-characters = open('/dev/stdin', 'r').read()
-
-pos = 0
-while pos < len(characters):
-    match = None
-    for reg, token in tokens:
-        match = reg.match(characters[pos:])
-        if match:
-            if token is not None:
-                lexer_output.append((token, match.group(0)))
-            length = len(match.group(0))
-            assert length > 0, characters[pos:(pos + 20)]
-            pos += length
-            break
-    else:
-        raise RuntimeError('Unable to lex: "%s"...' % (characters[pos:(pos + 20)]))
+# the token types are tried in this order at each position. the
+# names are those in Token; whitespace is skipped.
+tokens = [('WHITESPACE', '[ \n\t]+'),
+          ('EQUALS', '='),
+          ('QUOTE', '"[^"]*"'),
+          ('OPEN_CURLY', '{'),
+          ('CLOSE_CURLY', '}'),
+          ('OPEN_SQUARE', '\['),
+          ('CLOSE_SQUARE', ']'),
+          ('SEMICOLON', ';'),
+          ('IDENTIFIER', '[a-zA-Z0-9_]+'),
+          ('ARROW', '->')]
+
+# all token types in one regex so that each token is matched once
+master = re.compile('|'.join('(?P<%s>%s)' % t for t in tokens))
+
+# identifiers that are keywords
+keywords = {'digraph': Token.DIGRAPH,
+            'label': Token.LABEL}
+
+# generate (token, text) pairs. the regex is matched at the current
+# position in the input rather than copying the rest of the input for
+# each token.
+def lex(characters):
+    pos = 0
+    while pos < len(characters):
+        match = master.match(characters, pos)
+        if not match:
+            raise RuntimeError('Unable to lex: "%s"...' % (characters[pos:(pos + 20)]))
+        pos = match.end()
+        name = match.lastgroup
+        if name == 'WHITESPACE':
+            continue
+        text = match.group(name)
+        token = getattr(Token, name)
+        if token == Token.IDENTIFIER:
+            token = keywords.get(text, token)
+        yield token, text
 
 class Graph(object):
     def __init__(self, name):
@@ -67,44 +75,99 @@ class Graph(object):
     def add_statement(self, s):
         self.statements.append(s)
 
-    def __str__(self):
-        ret = 'digraph %s {\n' % self.name
+    def write(self, f):
+        writer = DotWriter(f, self.name)
         for s in self.statements:
-            ret += str(s) + '\n'
-        ret += '}\n'
-        return ret
+            writer.write(s)
+        writer.close()
 
+    def __str__(self):
+        f = StringIO.StringIO()
+        self.write(f)
+        return f.getvalue()
+
+    # remove redundant edges
     def simplify(self):
-        # return true if to_node is a child of from_node
-        def is_reachable(from_node, to_node):
-            for child in dep[from_node]:
-                if child == to_node:
-                    return True
-                if is_reachable(child, to_node):
-                    return True
-            return False
-
-        dep = collections.defaultdict(list)
-        for s in self.statements:
-            if isinstance(s, Edge):
-                dep[s.n1].append(s.n2)
-
-        # remove redundant edges
-        # an edge from a to b is redundant if a connection from a child of a to b is found
-        to_remove = list()
-        for parent_node, my_edges in dep.items():
-            for direct_child in copy.copy(my_edges):
-                to_visit = copy.copy(dep[direct_child])
-                while to_visit:
-                    indirect_child = to_visit.pop()
-                    to_visit.extend(dep[indirect_child])
-                    if is_reachable(direct_child, indirect_child) and indirect_child in dep[parent_node]:
-                        to_remove.append((parent_node, indirect_child))
-
-        for dependency, this_node in to_remove:
-            self.statements = [s for s in self.statements if not (isinstance(s, Edge) and s.n1 == dependency and s.n2 == this_node)]
+        redundant = transitive_reduction([(s.n1, s.n2) for s in self.statements if isinstance(s, Edge)])
+        self.statements = [s for s in self.statements
+                if not (isinstance(s, Edge) and (s.n1, s.n2) in redundant)]
+
+# return the set of redundant edges in a directed acyclic graph given as
+# a list of (from, to) pairs. an edge from a to b is redundant if b can
+# also be reached from another child of a.
+#
+# the nodes are numbered in topological order, and the nodes reachable
+# from each node are kept as the bits of an int. going through the
+# nodes in reverse order, the nodes reachable from a node are the
+# union of those reachable from its children. going through the
+# children in order, a child that's already reachable from an earlier
+# child is reached through it.
+def transitive_reduction(edges):
+    children = collections.defaultdict(set)
+    indegree = collections.defaultdict(int)
+    for n1, n2 in edges:
+        if n2 not in children[n1]:
+            children[n1].add(n2)
+            indegree[n2] += 1
+
+    order = [n for n in children if indegree[n] == 0]
+    for n in order:
+        for child in children[n]:
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                order.append(child)
+    if len(order) < len(set(children) | set(indegree)):
+        raise RuntimeError('The graph has a cycle')
+
+    number = dict((n, i) for i, n in enumerate(order))
+    reachable = [0] * len(order)
+    redundant = set()
+    for i in xrange(len(order) - 1, -1, -1):
+        n = order[i]
+        reach = 0
+        for child in sorted(children.get(n, ()), key=number.get):
+            j = number[child]
+            if reach >> j & 1:
+                redundant.add((n, child))
+            else:
+                reach |= reachable[j] | (1 << j)
+        reachable[i] = reach
+    return redundant
+
+# write a graph to a file statement by statement. the lines are
+# collected and written in chunks of about chunk_size bytes.
+class DotWriter(object):
+    def __init__(self, f, name, chunk_size=1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.lines = list()
+        self.size = 0
+        self.write_line('digraph %s {' % name)
+
+    def write_line(self, line):
+        self.lines.append(line)
+        self.size += len(line) + 1
+        if self.size >= self.chunk_size:
+            self.flush()
+
+    def write(self, statement):
+        self.write_line(str(statement))
+
+    def flush(self):
+        if self.lines:
+            self.lines.append('')
+            self.f.write('\n'.join(self.lines))
+            self.lines = list()
+            self.size = 0
+
+    # end the graph
+    def close(self):
+        self.write_line('}')
+        self.flush()
 
 class Label(object):
+    __slots__ = ('name', 'label')
+
     def __init__(self, name, label):
         self.name = name
         self.label = label
@@ -113,6 +176,8 @@ class Label(object):
         return '    %s [label=%s];' % (self.name, self.label)
 
 class Edge(object):
+    __slots__ = ('n1', 'n2')
+
     def __init__(self, n1, n2):
         self.n1 = n1
         self.n2 = n2
@@ -122,14 +187,12 @@ class Edge(object):
 
 class Parser(object):
     def __init__(self, lex):
-        self.lex = lex
-        self.pos = 0
-        self.token = self.lex[self.pos]
+        self.lex = iter(lex)
+        self.next()
 
     def next(self):
-        self.pos += 1
-        if self.pos < len(self.lex):
-            self.token = self.lex[self.pos]
+        # (None, None) after the end of the input
+        self.token = next(self.lex, (None, None))
 
     def parse(self):
         self.match(Token.DIGRAPH)
@@ -177,11 +240,16 @@ class Parser(object):
             else:
                 raise RuntimeError('Expected statement, received "%s"' % self.token)
 
-p = Parser(lexer_output)
-p.parse()
+def main():
+    characters = open('/dev/stdin', 'r').read()
+    p = Parser(lex(characters))
+    p.parse()
+
+    p.graph.simplify()
 
-p.graph.simplify()
+    p.graph.write(sys.stdout)
 
-print p.graph
+if __name__ == '__main__':
+    main()
 
 
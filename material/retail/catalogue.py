@@ -0,0 +1,87 @@
+# the product catalogue, a page at a time, and a cache for the
+# rendered pages
+#
+# the pages use keyset pagination: a page is the products after a given
+# product id, found using the primary key, rather than using OFFSET
+# which would go through all the products on the earlier pages.
+#
+# the products have a version number, increased by triggers whenever a
+# product is added, changed or removed by any connection. the cached
+# pages are for one version and are dropped when the version changes.
+# the pages also expire after a while in case the products were changed
+# without the triggers, e.g. by recreating the database with ins.py.
+
+import time
+import hashlib
+import datetime
+import threading
+import collections
+
+page_size = 50
+
+version_schema = [
+    'CREATE TABLE IF NOT EXISTS products_version(id INTEGER PRIMARY KEY, version INTEGER)',
+    'INSERT OR IGNORE INTO products_version(id, version) VALUES (1, 0)',
+    '''CREATE TRIGGER IF NOT EXISTS products_inserted AFTER INSERT ON products
+       BEGIN UPDATE products_version SET version = version + 1 WHERE id = 1; END''',
+    '''CREATE TRIGGER IF NOT EXISTS products_updated AFTER UPDATE ON products
+       BEGIN UPDATE products_version SET version = version + 1 WHERE id = 1; END''',
+    '''CREATE TRIGGER IF NOT EXISTS products_deleted AFTER DELETE ON products
+       BEGIN UPDATE products_version SET version = version + 1 WHERE id = 1; END''',
+]
+
+def create_version_table(db):
+    for statement in version_schema:
+        db.execute(statement)
+
+def get_version(db):
+    return db.execute('SELECT version FROM products_version WHERE id = 1').fetchone()[0]
+
+# return the products after the product id after, and the id to get
+# the next page with or None if this is the last page
+def get_page(db, after, count=page_size):
+    product_list = db.execute('''SELECT   id, name, size
+                                 FROM     products
+                                 WHERE    id > ?
+                                 ORDER BY id
+                                 LIMIT    ?''', (after, count + 1)).fetchall()
+    if len(product_list) > count:
+        return product_list[:count], product_list[count - 1][0]
+    return product_list, None
+
+Page = collections.namedtuple('Page', ['body', 'etag', 'last_modified', 'expires'])
+
+# the most recently used pages, at most max_pages of them, each kept
+# for at most ttl seconds
+class PageCache(object):
+    def __init__(self, max_pages=128, ttl=300.0):
+        self.max_pages = max_pages
+        self.ttl = ttl
+        self.version = None
+        self.pages = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, version, key):
+        with self.lock:
+            if version != self.version:
+                self.pages.clear()
+                self.version = version
+                return None
+            page = self.pages.pop(key, None)
+            if page is None or page.expires < time.time():
+                return None
+            self.pages[key] = page
+            return page
+
+    def put(self, version, key, body):
+        page = Page(body,
+                hashlib.sha1(body.encode('utf-8')).hexdigest(),
+                datetime.datetime.utcnow().replace(microsecond=0),
+                time.time() + self.ttl)
+        with self.lock:
+            if version == self.version:
+                self.pages.pop(key, None)
+                self.pages[key] = page
+                while len(self.pages) > self.max_pages:
+                    self.pages.popitem(last=False)
+        return page
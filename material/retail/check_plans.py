@@ -0,0 +1,116 @@
+#!/usr/bin/env python2
+
+# check that the queries of the shop don't scan whole tables
+# usage: check_plans.py [source files]; by default the files below
+#
+# the queries are picked from the cursor.execute calls in the source
+# files, and "EXPLAIN QUERY PLAN" is run on each in an empty in-memory
+# database with the tables from ins.py, catalogue.py and indexes.py.
+# a query that scans a whole table is an error unless the scan is
+# listed in allowed_scans. the exit status is 1 if there were errors.
+
+import os
+import re
+import sys
+import ast
+import sqlite3
+
+import ins
+import indexes
+import catalogue
+
+sources = ['shop.py', 'catalogue.py', 'print_return.py', 'queries.py']
+
+# (source file, function or None for module level, table): reason
+allowed_scans = {
+    ('shop.py', 'return_get_reason', 'return_reasons'):           'a handful of rows',
+    ('print_return.py', 'load_label', 'return_reasons'):          'a handful of rows',
+    ('queries.py', None, 'products_returned'):                     'report over all returns',
+    ('queries.py', None, 'products'):                              'report over all products',
+    ('queries.py', None, 'customers'):                             'report over all customers',
+    ('queries.py', None, 'products_ordered'):                      'report over all orders',
+}
+
+scan_reg = re.compile('^SCAN (?:TABLE )?(\w+)')
+
+# the arguments of string formatting in queries, e.g. ORDER BY %s
+format_argument = 'DESC'
+
+# find the queries in a python source file; return a list of
+# (line number, function name or None, query)
+class QueryFinder(ast.NodeVisitor):
+    def __init__(self):
+        self.functions = list()
+        self.queries = list()
+
+    def visit_FunctionDef(self, node):
+        self.functions.append(node.name)
+        self.generic_visit(node)
+        self.functions.pop()
+
+    def visit_Call(self, node):
+        func = node.func
+        if isinstance(func, ast.Attribute) and func.attr in ('execute', 'executemany') and node.args:
+            query = node.args[0]
+            if isinstance(query, ast.BinOp) and isinstance(query.op, ast.Mod):
+                query = query.left
+                formatted = True
+            else:
+                formatted = False
+            if isinstance(query, ast.Str):
+                text = query.s
+                if formatted:
+                    text = text.replace('%s', format_argument)
+                function = self.functions[-1] if self.functions else None
+                self.queries.append((node.lineno, function, text))
+        self.generic_visit(node)
+
+def find_queries(filename):
+    with open(filename, 'r') as f:
+        tree = ast.parse(f.read(), filename)
+    finder = QueryFinder()
+    finder.visit(tree)
+    return finder.queries
+
+def create_db():
+    db = sqlite3.connect(':memory:')
+    ins.create_tables(db, db.cursor())
+    indexes.create_indexes(db)
+    catalogue.create_version_table(db)
+    return db
+
+# return the tables scanned by the query
+def scanned_tables(cursor, query):
+    params = (1, ) * query.count('?')
+    cursor.execute('EXPLAIN QUERY PLAN ' + query, params)
+    tables = list()
+    for row in cursor.fetchall():
+        res = scan_reg.match(row[-1])
+        if res and res.group(1) not in ('CONSTANT', 'SUBQUERY'):
+            tables.append(res.group(1))
+    return tables
+
+def main():
+    filenames = sys.argv[1:] or sources
+    db = create_db()
+    cursor = db.cursor()
+    errors = 0
+    for filename in filenames:
+        for lineno, function, query in find_queries(filename):
+            if query.split()[0].upper() not in ('SELECT', 'INSERT', 'UPDATE', 'DELETE'):
+                continue
+            for table in scanned_tables(cursor, query):
+                where = '%s:%d (%s)' % (filename, lineno, function or 'module')
+                reason = allowed_scans.get((os.path.basename(filename), function, table))
+                if reason:
+                    print '%s: scans %s: allowed, %s' % (where, table, reason)
+                else:
+                    print '%s: scans %s' % (where, table)
+                    errors += 1
+    db.close()
+    if errors:
+        print '%d full table scans' % errors
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
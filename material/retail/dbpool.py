@@ -0,0 +1,86 @@
+# a pool of sqlite connections for the shop
+#
+# a connection can only be used by one thread at a time, so each
+# request borrows one from the pool and gives it back when done. the
+# connections are kept open so that sqlite's cache of prepared
+# statements (cached_statements) is reused between requests. the
+# database is in WAL mode so that reads don't wait for writes and vice
+# versa. the connections are in autocommit mode; writes are done in
+# short explicit transactions using transaction().
+
+import os
+import sys
+import Queue
+import sqlite3
+import contextlib
+
+class Pool(object):
+    def __init__(self, filename, size=8, cached_statements=100, timeout=10.0):
+        self.filename = filename
+        self.size = size
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self.idle = Queue.LifoQueue()
+
+    def connect(self):
+        db = sqlite3.connect(self.filename, timeout=self.timeout,
+                isolation_level=None, check_same_thread=False,
+                cached_statements=self.cached_statements)
+        db.execute('PRAGMA journal_mode = WAL')
+        db.execute('PRAGMA synchronous = NORMAL')
+        return db
+
+    def take(self):
+        # connections can't be shared with a forked process. the ones
+        # from the parent are kept but not closed, as closing them here
+        # could release the parent's locks.
+        if os.getpid() != self.pid:
+            self.pid = os.getpid()
+            self.inherited = self.idle
+            self.idle = Queue.LifoQueue()
+        try:
+            return self.idle.get_nowait()
+        except Queue.Empty:
+            return self.connect()
+
+    def give_back(self, db):
+        if self.idle.qsize() < self.size:
+            self.idle.put(db)
+        else:
+            db.close()
+
+    @contextlib.contextmanager
+    def connection(self):
+        db = self.take()
+        try:
+            yield db
+        finally:
+            self.give_back(db)
+
+    # the writes within are committed together, or rolled back if
+    # there's an exception, including when the commit itself fails
+    # e.g. because the database is busy. if even the rollback fails the
+    # connection is closed rather than given back to the pool in the
+    # middle of a transaction.
+    @contextlib.contextmanager
+    def transaction(self):
+        db = self.take()
+        begun = False
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            begun = True
+            yield db
+            db.execute('COMMIT')
+        except:
+            exc_info = sys.exc_info()
+            if begun:
+                try:
+                    db.execute('ROLLBACK')
+                except sqlite3.Error:
+                    db.close()
+                    db = None
+            if db is not None:
+                self.give_back(db)
+            raise exc_info[0], exc_info[1], exc_info[2]
+        self.give_back(db)
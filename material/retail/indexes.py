@@ -0,0 +1,16 @@
+# the indexes for the foreign keys, so that the joins and the lookups by
+# customer, order and return don't need to scan whole tables. they're
+# created after the data is loaded as that's faster than updating them
+# for each inserted row.
+
+indexes = [('orders_customer_id',                 'orders(customer_id)'),
+           ('products_ordered_order_id',          'products_ordered(order_id)'),
+           ('products_ordered_product_id',        'products_ordered(product_id)'),
+           ('products_returned_return_id',        'products_returned(return_id)'),
+           ('products_returned_product_order_id', 'products_returned(product_order_id)')]
+
+def create_indexes(db):
+    cursor = db.cursor()
+    for name, columns in indexes:
+        cursor.execute('CREATE INDEX IF NOT EXISTS %s ON %s' % (name, columns))
+    db.commit()
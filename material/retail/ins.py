@@ -1,126 +1,253 @@
 import random
+import argparse
 
 import sqlite3
 
-random.seed(21)
+import indexes
 
-db = sqlite3.connect('mydb')
-cursor = db.cursor()
-for table in ['customers', 'products', 'orders',
-        'products_ordered', 'returns', 'products_returned',
-        'return_reasons']:
-    cursor.execute('DROP TABLE if exists %s' % table)
+def create_tables(db, cursor):
+    for table in ['customers', 'products', 'orders',
+            'products_ordered', 'returns', 'products_returned',
+            'return_reasons']:
+        cursor.execute('DROP TABLE if exists %s' % table)
+        db.commit()
+
+    cursor.execute('''
+            CREATE TABLE customers(id INTEGER PRIMARY KEY,
+                                   name TEXT,
+                                   address TEXT,
+                                   zipcode TEXT,
+                                   city TEXT)''')
+    cursor.execute('''
+            CREATE TABLE products(id INTEGER PRIMARY KEY,
+                                   name TEXT,
+                                   size TEXT)''')
+    cursor.execute('''
+            CREATE TABLE orders(id INTEGER PRIMARY KEY,
+                                   date DATE,
+                                   customer_id INTEGER,
+                                   FOREIGN KEY(customer_id) REFERENCES customers(id))''')
+    cursor.execute('''
+            CREATE TABLE products_ordered(id INTEGER PRIMARY KEY,
+                                   order_id INTEGER,
+                                   product_id INTEGER,
+                                   FOREIGN KEY(order_id) REFERENCES orders(id),
+                                   FOREIGN KEY(product_id) REFERENCES products(id))''')
+    cursor.execute('''
+            CREATE TABLE returns(id INTEGER PRIMARY KEY,
+                                   order_id INTEGER UNIQUE,
+                                   FOREIGN KEY(order_id) REFERENCES orders(id))''')
+    cursor.execute('''
+            CREATE TABLE return_reasons(id INTEGER PRIMARY KEY,
+                                   description TEXT)''')
+    for description in ['Too large', 'Too small', 'Not as expected', 'Other']:
+        cursor.execute('INSERT INTO return_reasons(description) VALUES(?)',
+                (description, ))
+    cursor.execute('''
+            CREATE TABLE products_returned(id INTEGER PRIMARY KEY,
+                                   return_id INTEGER,
+                                   return_reason_id INTEGER,
+                                   product_order_id INTEGER,
+                                   FOREIGN KEY(product_order_id) REFERENCES products_ordered(id),
+                                   FOREIGN KEY(return_id) REFERENCES returns(id),
+                                   FOREIGN KEY(return_reason_id) REFERENCES return_reasons(id))''')
     db.commit()
 
-cursor.execute('''
-        CREATE TABLE customers(id INTEGER PRIMARY KEY,
-                               name TEXT,
-                               address TEXT,
-                               zipcode TEXT,
-                               city TEXT)''')
-cursor.execute('''
-        CREATE TABLE products(id INTEGER PRIMARY KEY,
-                               name TEXT,
-                               size TEXT)''')
-cursor.execute('''
-        CREATE TABLE orders(id INTEGER PRIMARY KEY,
-                               date DATE,
-                               customer_id INTEGER,
-                               FOREIGN KEY(customer_id) REFERENCES customers(id))''')
-cursor.execute('''
-        CREATE TABLE products_ordered(id INTEGER PRIMARY KEY,
-                               order_id INTEGER,
-                               product_id INTEGER,
-                               FOREIGN KEY(order_id) REFERENCES orders(id),
-                               FOREIGN KEY(product_id) REFERENCES products(id))''')
-cursor.execute('''
-        CREATE TABLE returns(id INTEGER PRIMARY KEY,
-                               order_id INTEGER UNIQUE,
-                               FOREIGN KEY(order_id) REFERENCES orders(id))''')
-cursor.execute('''
-        CREATE TABLE return_reasons(id INTEGER PRIMARY KEY,
-                               description TEXT)''')
-for description in ['Too large', 'Too small', 'Not as expected', 'Other']:
-    cursor.execute('INSERT INTO return_reasons(description) VALUES(?)',
-            (description, ))
-cursor.execute('''
-        CREATE TABLE products_returned(id INTEGER PRIMARY KEY,
-                               return_id INTEGER,
-                               return_reason_id INTEGER,
-                               product_order_id INTEGER,
-                               FOREIGN KEY(product_order_id) REFERENCES products_ordered(id),
-                               FOREIGN KEY(return_id) REFERENCES returns(id),
-                               FOREIGN KEY(return_reason_id) REFERENCES return_reasons(id))''')
-db.commit()
-
-for i in xrange(100):
-    color = random.choice(['Red', 'Green', 'Blue', 'Yellow', 'Black', 'White', 'Orange'])
-    gender = random.choice(["Men's", "Women's"])
-    clothing = random.choice(['Jeans', 'Shirt', 'T-Shirt', 'Cardigan', 'Skirt', 'Dress', 'Belt'])
-    name = '%s %s %s' % (color, gender, clothing)
-    sizes = random.choice([['S', 'M', 'L', 'XL'], ['36', '38', '40', '42']])
-    for size in sizes:
-        cursor.execute('INSERT INTO products(name, size) VALUES(?, ?)',
-                (name, size))
-
-cursor.execute('SELECT id FROM products')
-all_product_ids = cursor.fetchall()
-all_product_ids = [x for (x,) in all_product_ids]
-
-cursor.execute('SELECT count(*) from return_reasons')
-num_return_reasons = cursor.fetchone()[0]
-assert num_return_reasons > 0
-
-for i in xrange(1000):
-    first_name = random.choice(['John', 'Jane', 'Roger', 'Maria', 'Andy', 'William', 'Leah'])
-    surname = random.choice(['Smith', 'Williams', 'Baker', 'Armstrong', 'Miller'])
+def insert_products(cursor):
+    for i in xrange(100):
+        color = random.choice(['Red', 'Green', 'Blue', 'Yellow', 'Black', 'White', 'Orange'])
+        gender = random.choice(["Men's", "Women's"])
+        clothing = random.choice(['Jeans', 'Shirt', 'T-Shirt', 'Cardigan', 'Skirt', 'Dress', 'Belt'])
+        name = '%s %s %s' % (color, gender, clothing)
+        sizes = random.choice([['S', 'M', 'L', 'XL'], ['36', '38', '40', '42']])
+        for size in sizes:
+            cursor.execute('INSERT INTO products(name, size) VALUES(?, ?)',
+                    (name, size))
+
+first_names = ['John', 'Jane', 'Roger', 'Maria', 'Andy', 'William', 'Leah']
+surnames = ['Smith', 'Williams', 'Baker', 'Armstrong', 'Miller']
+street_names = ['Elm', 'Oak',
+    'Maple', 'Penn', 'Pine', 'Ash', 'Aspen',
+    'Cherry', 'Willow', 'Beech']
+roads = ['Road', 'Street', 'Avenue', 'Lane', 'Parkway']
+cities = ['New York', 'Washington D.C.', 'Chicago']
+years = [2015, 2016, 2017, 2018]
+
+def random_customer():
+    first_name = random.choice(first_names)
+    surname = random.choice(surnames)
     name = '%s %s' % (first_name, surname)
     housenr = random.randint(1, 8000)
-    street_name = random.choice(['Elm', 'Oak',
-        'Maple', 'Penn', 'Pine', 'Ash', 'Aspen',
-        'Cherry', 'Willow', 'Beech'])
-    road = random.choice(['Road', 'Street', 'Avenue', 'Lane', 'Parkway'])
+    street_name = random.choice(street_names)
+    road = random.choice(roads)
     zipcode = random.randint(10000, 99999)
-    city = random.choice(['New York', 'Washington D.C.', 'Chicago'])
+    city = random.choice(cities)
     address = '%s %s %s' % (housenr, street_name, road)
+    return name, address, zipcode, city
+
+def random_date():
+    year = random.choice(years)
+    month = random.randint(1, 12)
+    day = random.randint(1, 28)
+    return "%04d-%02d-%02d" % (year, month, day)
+
+def insert_customers(cursor, num_customers, all_product_ids, num_return_reasons):
+    for i in xrange(num_customers):
+        cursor.execute('INSERT INTO customers(name, address, zipcode, city) VALUES(?, ?, ?, ?)',
+                random_customer())
+        customer_id = cursor.lastrowid
+
+        # each customer has between 2 and 50 orders
+        for i in xrange(random.randint(2, 50)):
+            date = random_date()
+            cursor.execute('INSERT INTO orders(date, customer_id) VALUES(?, ?)',
+                    (date, customer_id))
+            order_id = cursor.lastrowid
+            product_order_ids = list()
+            num_products_ordered = random.randint(2, 7)
+
+            # each order has between 2 and 7 products
+            for j in xrange(num_products_ordered):
+                product_id = random.choice(all_product_ids)
+                cursor.execute('INSERT INTO products_ordered(order_id, product_id) VALUES(?, ?)',
+                        (order_id, product_id))
+                product_order_ids.append(cursor.lastrowid)
+            random.shuffle(product_order_ids)
+
+            # each order may have some returns
+            return_id = None
+            for j in xrange(random.randint(0, num_products_ordered)):
+                if not return_id:
+                    cursor.execute('INSERT INTO returns(order_id) VALUES (?)',
+                            (order_id, ))
+                    return_id = cursor.lastrowid
+                product_order_id = product_order_ids.pop()
+                return_reason_id = random.randint(1, num_return_reasons)
+                cursor.execute('''INSERT INTO products_returned(
+                            return_id, return_reason_id, product_order_id) VALUES (?, ?, ?)''',
+                            (return_id, return_reason_id, product_order_id))
+
+# same as insert_customers, but the ids are assigned here the same way
+# sqlite assigns them to the rows of the new tables (1, 2, 3...), and
+# the rows are inserted with executemany in batches of batch_size rows
+# in one transaction each.
+#
+# much of the time would go to the functions of the random module, so
+# they're written out here the way python 2 implements them:
+# random.choice(seq) is seq[int(random() * len(seq))],
+# random.randint(a, b) is a + int(random() * (b - a + 1)) and
+# random.shuffle(x) swaps x[i] with x[int(random() * (i + 1))] for
+# each i from the end. this draws exactly the same random numbers, so
+# the data is the same as with insert_customers.
+def bulk_insert_customers(db, cursor, num_customers, all_product_ids, num_return_reasons, batch_size):
+    rows = dict((table, list()) for table in ['customers', 'orders',
+        'products_ordered', 'returns', 'products_returned'])
+    inserts = {'customers':         'INSERT INTO customers(id, name, address, zipcode, city) VALUES(?, ?, ?, ?, ?)',
+               'orders':            'INSERT INTO orders(id, date, customer_id) VALUES(?, ?, ?)',
+               'products_ordered':  'INSERT INTO products_ordered(id, order_id, product_id) VALUES(?, ?, ?)',
+               'returns':           'INSERT INTO returns(id, order_id) VALUES(?, ?)',
+               'products_returned': '''INSERT INTO products_returned(
+                                           id, return_id, return_reason_id, product_order_id) VALUES(?, ?, ?, ?)'''}
+
+    def flush():
+        for table, table_rows in rows.items():
+            cursor.executemany(inserts[table], table_rows)
+            del table_rows[:]
+        db.commit()
+
+    add_customer = rows['customers'].append
+    add_order = rows['orders'].append
+    add_product_ordered = rows['products_ordered'].append
+    add_return = rows['returns'].append
+    add_product_returned = rows['products_returned'].append
+    products_ordered = rows['products_ordered']
+    rnd = random.random
+    num_products = len(all_product_ids)
+    order_id = 0
+    product_order_id = 0
+    return_id = 0
+    product_returned_id = 0
+    for customer_id in xrange(1, num_customers + 1):
+        # random_customer()
+        name = '%s %s' % (first_names[int(rnd() * 7)], surnames[int(rnd() * 5)])
+        housenr = 1 + int(rnd() * 8000)
+        address = '%s %s %s' % (housenr, street_names[int(rnd() * 10)], roads[int(rnd() * 5)])
+        zipcode = 10000 + int(rnd() * 90000)
+        add_customer((customer_id, name, address, zipcode, cities[int(rnd() * 3)]))
 
-    cursor.execute('INSERT INTO customers(name, address, zipcode, city) VALUES(?, ?, ?, ?)',
-            (name, address, zipcode, city))
-    customer_id = cursor.lastrowid
-
-    # each customer has between 2 and 50 orders
-    for i in xrange(random.randint(2, 50)):
-        year = random.choice([2015, 2016, 2017, 2018])
-        month = random.randint(1, 12)
-        day = random.randint(1, 28)
-        date = "%04d-%02d-%02d" % (year, month, day)
-        cursor.execute('INSERT INTO orders(date, customer_id) VALUES(?, ?)',
-                (date, customer_id))
-        order_id = cursor.lastrowid
-        product_order_ids = list()
-        num_products_ordered = random.randint(2, 7)
-
-        # each order has between 2 and 7 products
-        for j in xrange(num_products_ordered):
-            product_id = random.choice(all_product_ids)
-            cursor.execute('INSERT INTO products_ordered(order_id, product_id) VALUES(?, ?)',
-                    (order_id, product_id))
-            product_order_ids.append(cursor.lastrowid)
-        random.shuffle(product_order_ids)
-
-        # each order may have some returns
-        return_id = None
-        for j in xrange(random.randint(0, num_products_ordered)):
-            if not return_id:
-                cursor.execute('INSERT INTO returns(order_id) VALUES (?)',
-                        (order_id, ))
-                return_id = cursor.lastrowid
-            product_order_id = product_order_ids.pop()
-            return_reason_id = random.randint(1, num_return_reasons)
-            cursor.execute('''INSERT INTO products_returned(
-                        return_id, return_reason_id, product_order_id) VALUES (?, ?, ?)''',
-                        (return_id, return_reason_id, product_order_id))
-
-db.commit()
-db.close()
+        for i in xrange(2 + int(rnd() * 49)):
+            order_id += 1
+            # random_date()
+            year = years[int(rnd() * 4)]
+            month = 1 + int(rnd() * 12)
+            day = 1 + int(rnd() * 28)
+            add_order((order_id, "%04d-%02d-%02d" % (year, month, day), customer_id))
+            num_products_ordered = 2 + int(rnd() * 6)
+            product_order_ids = range(product_order_id + 1, product_order_id + num_products_ordered + 1)
+            for j in product_order_ids:
+                add_product_ordered((j, order_id, all_product_ids[int(rnd() * num_products)]))
+            product_order_id += num_products_ordered
+            # random.shuffle(product_order_ids)
+            for j in xrange(num_products_ordered - 1, 0, -1):
+                k = int(rnd() * (j + 1))
+                product_order_ids[j], product_order_ids[k] = product_order_ids[k], product_order_ids[j]
+
+            num_returned = int(rnd() * (num_products_ordered + 1))
+            if num_returned:
+                return_id += 1
+                add_return((return_id, order_id))
+            for j in xrange(num_returned):
+                product_returned_id += 1
+                add_product_returned((product_returned_id, return_id,
+                    1 + int(rnd() * num_return_reasons), product_order_ids.pop()))
+
+        if len(products_ordered) >= batch_size:
+            flush()
+    flush()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default='mydb')
+    parser.add_argument('--customers', type=int, default=1000)
+    parser.add_argument('--bulk', action='store_true',
+            help='pre-assign the ids and insert the rows in batches')
+    parser.add_argument('--batch-size', type=int, default=100000,
+            help='number of ordered products per transaction with --bulk')
+    parser.add_argument('--journal-mode',
+            help='sqlite journal mode during the load, e.g. off, memory or wal')
+    parser.add_argument('--synchronous',
+            help='sqlite synchronous setting during the load, e.g. off or normal')
+    args = parser.parse_args()
+
+    random.seed(21)
+
+    db = sqlite3.connect(args.db)
+    cursor = db.cursor()
+    if args.journal_mode:
+        cursor.execute('PRAGMA journal_mode = %s' % args.journal_mode)
+    if args.synchronous:
+        cursor.execute('PRAGMA synchronous = %s' % args.synchronous)
+
+    create_tables(db, cursor)
+    insert_products(cursor)
+
+    cursor.execute('SELECT id FROM products')
+    all_product_ids = cursor.fetchall()
+    all_product_ids = [x for (x,) in all_product_ids]
+
+    cursor.execute('SELECT count(*) from return_reasons')
+    num_return_reasons = cursor.fetchone()[0]
+    assert num_return_reasons > 0
+
+    if args.bulk:
+        db.commit()
+        bulk_insert_customers(db, cursor, args.customers, all_product_ids, num_return_reasons, args.batch_size)
+    else:
+        insert_customers(cursor, args.customers, all_product_ids, num_return_reasons)
+
+    db.commit()
+    indexes.create_indexes(db)
+    db.close()
 
+if __name__ == '__main__':
+    main()
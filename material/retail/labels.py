@@ -0,0 +1,178 @@
+# the return labels, generated in a pool of worker processes and cached
+# on disk
+#
+# a label is identified by the return id and a hash of the returned
+# products and their reasons, so printing the same return again is
+# served from the cache while a changed return gets a new label. the
+# labels are generated in separate processes so that the requests don't
+# wait for them; the shop asks for a label with request() and checks
+# whether it's ready with get(). only request() starts generating a
+# label; get() only reports on labels that have been requested.
+#
+# everything about a label is in files in the cache directory, named
+# after the key, so that all the processes of the shop see the same
+# labels whichever of them was asked for it:
+#
+#   <return_id>-<digest>.pending   the label is being generated
+#   <return_id>-<digest>.pdf       the label
+#   <return_id>-<digest>.err       generating the label failed
+#
+# the files are written to a temporary file and renamed so that a
+# half written file is never seen.
+
+import os
+import time
+import errno
+import hashlib
+import tempfile
+import threading
+import traceback
+import multiprocessing
+
+import print_return
+
+# the key of a label; products is a list of
+# (product order id, return reason id)
+def label_key(return_id, products):
+    h = hashlib.sha1()
+    for product_order_id, reason_id in sorted((int(p), int(r)) for p, r in products):
+        h.update('%d:%d\n' % (product_order_id, reason_id))
+    return int(return_id), h.hexdigest()
+
+def label_path(cache_dir, key, ext):
+    return os.path.join(cache_dir, '%d-%s.%s' % (key[0], key[1], ext))
+
+def write_file(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.rename(tmp_path, path)
+    except:
+        os.remove(tmp_path)
+        raise
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+
+# keep the max_labels most recently written labels
+def prune(cache_dir, max_labels):
+    pdfs = [os.path.join(cache_dir, f) for f in os.listdir(cache_dir) if f.endswith('.pdf')]
+    if len(pdfs) <= max_labels:
+        return
+    mtimes = list()
+    for path in pdfs:
+        try:
+            mtimes.append((os.path.getmtime(path), path))
+        except OSError:
+            pass
+    mtimes.sort()
+    for mtime, path in mtimes[:len(mtimes) - max_labels]:
+        remove_file(path)
+
+# run in the worker processes. the label is stored under the key of the
+# products that are in the database when generating it, as they may
+# have changed since the label was requested.
+def generate(cache_dir, requested_key, max_labels):
+    try:
+        data, return_reasons = print_return.load_label(requested_key[0])
+        key = label_key(requested_key[0], [(row[13], row[12]) for row in data])
+        pdf = print_return.render_label(requested_key[0], data, return_reasons)
+        write_file(label_path(cache_dir, key, 'pdf'), pdf.output('', 'S'))
+        if key != requested_key:
+            write_file(label_path(cache_dir, requested_key, 'err'),
+                    'the return was changed after requesting the label\n')
+        prune(cache_dir, max_labels)
+    except Exception:
+        write_file(label_path(cache_dir, requested_key, 'err'), traceback.format_exc())
+    finally:
+        remove_file(label_path(cache_dir, requested_key, 'pending'))
+
+class LabelService(object):
+    # a label that has been pending for longer than this is taken to
+    # have been lost, e.g. because the shop was restarted
+    timeout = 60.0
+
+    def __init__(self, cache_dir='labels', processes=2, max_labels=256):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.processes = processes
+        self.max_labels = max_labels
+        self.pid = None
+        self.workers = None
+        self.lock = threading.Lock()
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    # the worker pool of this process. like dbpool.Pool, a forked
+    # process starts its own, as the pool's threads aren't forked along
+    # with it.
+    def pool(self):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.workers = multiprocessing.Pool(self.processes)
+            return self.workers
+
+    # start generating the label unless it's already cached or being
+    # generated, possibly by another process
+    def request(self, key):
+        if os.path.exists(label_path(self.cache_dir, key, 'pdf')):
+            return
+        try:
+            fd = os.open(label_path(self.cache_dir, key, 'pending'), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except OSError as e:
+            if e.errno == errno.EEXIST:
+                return
+            raise
+        os.close(fd)
+        remove_file(label_path(self.cache_dir, key, 'err'))
+        self.pool().apply_async(generate, (self.cache_dir, key, self.max_labels))
+
+    def read_label(self, key):
+        try:
+            with open(label_path(self.cache_dir, key, 'pdf'), 'rb') as f:
+                return f.read()
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            return None
+
+    # return (status, pdf or error) where status is one of 'done',
+    # 'pending', 'failed' or None for a label that wasn't requested or
+    # has been dropped from the cache. an error is only reported once.
+    def get(self, key):
+        pdf = self.read_label(key)
+        if pdf is not None:
+            return 'done', pdf
+        pending = label_path(self.cache_dir, key, 'pending')
+        try:
+            if time.time() - os.path.getmtime(pending) < self.timeout:
+                return 'pending', None
+            remove_file(pending)
+            return 'failed', 'the label was not generated in %d seconds\n' % self.timeout
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+        err = label_path(self.cache_dir, key, 'err')
+        try:
+            with open(err, 'r') as f:
+                error = f.read()
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            # the label may have been finished since it was looked for
+            pdf = self.read_label(key)
+            if pdf is not None:
+                return 'done', pdf
+            return None, None
+        remove_file(err)
+        return 'failed', error
+
+    def close(self):
+        if self.workers is not None and self.pid == os.getpid():
+            self.workers.close()
+            self.workers.join()
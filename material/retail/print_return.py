@@ -1,11 +1,16 @@
+import os
+import shutil
 import sqlite3
+import tempfile
 
 from fpdf import FPDF
 
 import barcode
 from barcode.writer import ImageWriter
 
-def generate_label(return_id):
+# return the returned products of the return, with the customer and
+# order details, and the return reasons
+def load_label(return_id):
     db = sqlite3.connect('mydb')
     cursor = db.cursor()
     cursor.execute('''SELECT customers.name,
@@ -20,7 +25,8 @@ def generate_label(return_id):
             products.id,
             returns.id,
             products_returned.id,
-            products_returned.return_reason_id
+            products_returned.return_reason_id,
+            products_ordered.id
             FROM products_returned 
             INNER JOIN returns          ON returns.id          = products_returned.return_id 
             INNER JOIN products_ordered ON products_ordered.id = products_returned.product_order_id
@@ -29,13 +35,16 @@ def generate_label(return_id):
             INNER JOIN customers        ON customers.id        = orders.customer_id
             WHERE returns.id = ?''', (return_id, ))
     data = cursor.fetchall()
-    firstrow = data[0]
 
     cursor.execute('''SELECT id, description 
                       FROM return_reasons''')
     return_reasons = cursor.fetchall()
 
     db.close()
+    return data, return_reasons
+
+def render_label(return_id, data, return_reasons):
+    firstrow = data[0]
 
     pdf = FPDF()
     pdf.add_page()
@@ -52,11 +61,16 @@ def generate_label(return_id):
     pdf.cell(40, 10, firstrow[1],  ln=1, align='l')
     pdf.cell(40, 10, "%s %s" % (firstrow[2], firstrow[3]), ln=1, align='l')
 
-    # bar code
+    # bar code, in a directory of its own so that labels can be
+    # generated in parallel
     bclass = barcode.get_barcode_class('code39')
     code = bclass(str(return_id), writer=ImageWriter(), add_checksum=False)
-    fullname = code.save('barcode')
-    pdf.image('barcode.png', 140, 10, 60)
+    tmpdir = tempfile.mkdtemp()
+    try:
+        fullname = code.save(os.path.join(tmpdir, 'barcode'))
+        pdf.image(fullname, 140, 10, 60)
+    finally:
+        shutil.rmtree(tmpdir)
 
     # order number and customer number
     pdf.set_xy(140, 80)
@@ -95,6 +109,10 @@ def generate_label(return_id):
 
     return pdf
 
+def generate_label(return_id):
+    data, return_reasons = load_label(return_id)
+    return render_label(return_id, data, return_reasons)
+
 if __name__ == '__main__':
     import sys
     return_id = int(sys.argv[1])
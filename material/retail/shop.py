@@ -1,11 +1,17 @@
-from flask import Flask, render_template, request, make_response
+import sys
+
+from flask import Flask, render_template, request, make_response, redirect, url_for
 app = Flask(__name__)
 
-import sqlite3
-import print_return
+import dbpool
+import catalogue
+import labels
 
-db = sqlite3.connect('mydb')
-cursor = db.cursor()
+pool = dbpool.Pool('mydb')
+with pool.transaction() as db:
+    catalogue.create_version_table(db)
+product_pages = catalogue.PageCache()
+return_labels = labels.LabelService()
 
 def make_product(p):
     if len(p) > 3:
@@ -20,29 +26,41 @@ def make_reason(p):
     return {'id': p[0], 'description': p[1]}
 
 def get_order_products(order_id):
-    cursor.execute('''SELECT     products.id, products.name, products.size, products_ordered.id
-                      FROM       products
-                      INNER JOIN products_ordered ON products_ordered.product_id = products.id
-                      INNER JOIN orders           ON orders.id                   = products_ordered.order_id
-                      WHERE      orders.id = ?''', (order_id, ))
-    product_list = cursor.fetchall()
+    with pool.connection() as db:
+        product_list = db.execute('''SELECT     products.id, products.name, products.size, products_ordered.id
+                                     FROM       products
+                                     INNER JOIN products_ordered ON products_ordered.product_id = products.id
+                                     INNER JOIN orders           ON orders.id                   = products_ordered.order_id
+                                     WHERE      orders.id = ?''', (order_id, )).fetchall()
     return [make_product(o) for o in product_list]
 
+# the products after the product id given as "after", if any
 @app.route("/products/", methods=['GET'])
 def products():
-    cursor.execute('''SELECT   * FROM products''')
-    product_list = cursor.fetchall()
-    product_list = [make_product(p) for p in product_list]
-    return render_template('products.html', product_list=product_list)
+    after = request.args.get('after', 0, type=int)
+    with pool.connection() as db:
+        version = catalogue.get_version(db)
+        page = product_pages.get(version, after)
+        if page is None:
+            product_list, next_after = catalogue.get_page(db, after)
+    if page is None:
+        product_list = [make_product(p) for p in product_list]
+        body = render_template('products.html', product_list=product_list, next_after=next_after)
+        page = product_pages.put(version, after, body)
+    response = make_response(page.body)
+    response.set_etag(page.etag)
+    response.last_modified = page.last_modified
+    # 304 Not Modified if the client has the same page already
+    return response.make_conditional(request)
 
 @app.route("/orders/", methods=['GET'])
 def orders():
     customer_id = request.args.get('customer_id', 1)
-    cursor.execute('''SELECT     *
-                      FROM       orders
-                      INNER JOIN customers ON customers.id = orders.customer_id
-                      WHERE      customers.id = ?''', (customer_id, ))
-    order_list = cursor.fetchall()
+    with pool.connection() as db:
+        order_list = db.execute('''SELECT     *
+                                   FROM       orders
+                                   INNER JOIN customers ON customers.id = orders.customer_id
+                                   WHERE      customers.id = ?''', (customer_id, )).fetchall()
     order_list = [make_order(o) for o in order_list]
     return render_template('orders.html', order_list=order_list, customer_id=customer_id)
 
@@ -57,8 +75,8 @@ def return_get_reason():
     order_id = request.args.get('order_id')
     product_list = get_order_products(order_id)
     product_list = [p for p in product_list if request.args.get(str(p['id']))]
-    cursor.execute('''SELECT * FROM return_reasons''')
-    reason_list = cursor.fetchall()
+    with pool.connection() as db:
+        reason_list = db.execute('''SELECT * FROM return_reasons''').fetchall()
     reason_list = [make_reason(o) for o in reason_list]
     reason_list[0]['default'] = True
     return render_template('return.html', product_list=product_list, reason_list=reason_list, order_id=order_id)
@@ -75,23 +93,38 @@ def return_print():
         reasons.append(reason)
     product_list = zip(product_list, reasons)
 
-    # update database
-    cursor.execute('INSERT OR IGNORE INTO returns(order_id) VALUES (?)',
-            (order_id, ))
-    cursor.execute('SELECT id FROM returns WHERE order_id = ?', (order_id, ))
-    return_id = cursor.fetchone()[0]
-    cursor.execute('DELETE FROM products_returned WHERE return_id = ?', (return_id, ))
-    for p, r in product_list:
-        product_order_id = p['product_order_id']
-        cursor.execute('''INSERT INTO products_returned(
+    # update database in one short transaction
+    with pool.transaction() as db:
+        db.execute('INSERT OR IGNORE INTO returns(order_id) VALUES (?)',
+                (order_id, ))
+        return_id = db.execute('SELECT id FROM returns WHERE order_id = ?', (order_id, )).fetchone()[0]
+        db.execute('DELETE FROM products_returned WHERE return_id = ?', (return_id, ))
+        db.executemany('''INSERT INTO products_returned(
                     return_id, return_reason_id, product_order_id) VALUES (?, ?, ?)''',
-                    (return_id, r, product_order_id))
-    db.commit()
+                    [(return_id, r, p['product_order_id']) for p, r in product_list])
+
+    # start generating the pdf and send the client to where it will be
+    key = labels.label_key(return_id, [(p['product_order_id'], r) for p, r in product_list])
+    return_labels.request(key)
+    return redirect(url_for('return_label', return_id=key[0], digest=key[1]), code=303)
 
-    # generate and send pdf
-    pdf = print_return.generate_label(return_id)
-    binary_stream = pdf.output('', 'S')
-    response = make_response(binary_stream)
+# the pdf if it's ready, otherwise 202 Accepted and the client should
+# try again. labels are only generated by print.html, so anything else
+# is 404 Not Found.
+@app.route("/label/<int:return_id>/<digest>.pdf", methods=['GET'])
+def return_label(return_id, digest):
+    status, result = return_labels.get((return_id, digest))
+    if status is None:
+        return make_response('No such return label\n', 404)
+    if status == 'failed':
+        sys.stderr.write(result)
+        return make_response('Generating the return label failed\n', 500)
+    if status == 'pending':
+        response = make_response('The return label is being generated\n', 202)
+        response.headers['Retry-After'] = '1'
+        response.headers['Refresh'] = '1'
+        return response
+    response = make_response(result)
     response.headers['Content-Type'] = 'application/pdf'
     response.headers['Content-Disposition'] = 'inline; filename=return.pdf'
     return response
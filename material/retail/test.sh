@@ -5,7 +5,9 @@ set -e
 #echo Creating database
 #python2 ins.py
 echo Testing queries
-python2 select.py
+python2 queries.py
+echo Checking query plans
+python2 check_plans.py
 echo Generating pdf
 python2 print_return.py 12345
 echo Testing web shop
@@ -19,10 +21,22 @@ rm -rf testing
 mkdir testing
 pushd testing
 curl -s "http://127.0.0.1:8554/products/" > products.html
+curl -s "http://127.0.0.1:8554/products/?after=50" > products2.html
+# the same page again with its etag should be 304 Not Modified
+ETAG=$(curl -s -D - -o /dev/null "http://127.0.0.1:8554/products/" | tr -d '\r' | sed -n 's/^ETag: //Ip')
+curl -s -o /dev/null -w "%{http_code}\n" -H "If-None-Match: $ETAG" "http://127.0.0.1:8554/products/" > products_304.txt
 curl -s "http://127.0.0.1:8554/orders/?customer_id=5" > orders.html
 curl -s "http://127.0.0.1:8554/order/?order_id=148" > order.html
 curl -s "http://127.0.0.1:8554/return.html?order_id=148&109=on&174=on" > ret.html
-curl -s -d "order_id=148&109=1&174=4" "http://127.0.0.1:8554/print.html" > out.pdf
+# the label is generated in the background; wait for it
+LABEL=$(curl -s -o /dev/null -w "%{redirect_url}" -d "order_id=148&109=1&174=4" "http://127.0.0.1:8554/print.html")
+for i in $(seq 20); do
+    [ "$(curl -s -o out.pdf -w "%{http_code}" "$LABEL")" = 200 ] && break
+    sleep 0.5
+done
+# printing the same return again is served from the cache
+LABEL2=$(curl -s -o /dev/null -w "%{redirect_url}" -d "order_id=148&109=1&174=4" "http://127.0.0.1:8554/print.html")
+curl -s -o out2.pdf -w "%{http_code}\n" "$LABEL2" > out2_status.txt
 
 kill $FLASK_PID
 popd